@@ -0,0 +1,128 @@
+"""
+Benchmark for decoding and encoding the guild config.
+
+Generates a config with many guilds and compares the original untyped
+``json.load``/``json.dump(indent=4)`` round trip against the typed schema
+codec in ``quizbot.schema`` (which also migrates and validates).
+
+Run from the repository root:
+
+    python -m benchmarks.config_codec --guilds 10000
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Callable, List, Optional
+
+from quizbot import schema
+
+EMBED = {
+    "thumbnail": {
+        "width": 1000,
+        "url": "https://cdn.discordapp.com/ephemeral-attachments/1/2/thumbnail.gif",
+        "proxy_url": "https://media.discordapp.net/ephemeral-attachments/1/2/thumbnail.gif",
+        "height": 1000,
+    },
+    "type": "rich",
+    "description": "You're a genius :brain: Having now passed the quiz, you've been allowed through the gates.",
+    "title": "Welcome!",
+}
+
+
+def generate(guilds: int, quizzed: int) -> dict:
+    """A config in the original (v0) layout"""
+
+    rng = random.Random(0)
+    return {
+        str(rng.getrandbits(60)): {
+            "quiz_message_id": rng.getrandbits(60),
+            "quiz_channel_id": rng.getrandbits(60),
+            "correct": dict(EMBED),
+            "incorrect": dict(EMBED),
+            "quiz": dict(EMBED),
+            "quizzed": [rng.getrandbits(60) for _ in range(quizzed)],
+        }
+        for _ in range(guilds)
+    }
+
+
+def legacy_load_data(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def legacy_dump_data(path: str, data: dict) -> None:
+    with open(path, "w") as f:
+        json.dump(data, f, indent=4)
+
+
+def typed_load_data(path: str) -> schema.ConfigFile:
+    with open(path, "rb") as f:
+        return schema.decode(f.read())
+
+
+def typed_dump_data(path: str, data: schema.ConfigFile) -> None:
+    with open(path, "wb") as f:
+        f.write(schema.encode(data))
+
+
+def best_of(repeat: int, func: Callable[[], object]) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--guilds", type=int, default=10_000)
+    parser.add_argument("--quizzed", type=int, default=20, help="members per guild")
+    parser.add_argument("--repeat", type=int, default=5)
+    opts = parser.parse_args(args)
+
+    raw = generate(opts.guilds, opts.quizzed)
+    codec = "msgspec" if schema.msgspec is not None else "json"
+    print(f"{opts.guilds} guilds, {opts.quizzed} quizzed members each ({codec})")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.json")
+        typed_path = os.path.join(tmp, "typed.json")
+
+        legacy_dump_data(legacy_path, raw)
+        legacy = legacy_load_data(legacy_path)
+
+        # first typed load migrates the legacy file
+        typed = typed_load_data(legacy_path)
+        typed_dump_data(typed_path, typed)
+
+        rows = [
+            (
+                "legacy",
+                best_of(opts.repeat, lambda: legacy_load_data(legacy_path)),
+                best_of(opts.repeat, lambda: legacy_dump_data(legacy_path, legacy)),
+                os.path.getsize(legacy_path),
+            ),
+            (
+                "typed",
+                best_of(opts.repeat, lambda: typed_load_data(typed_path)),
+                best_of(opts.repeat, lambda: typed_dump_data(typed_path, typed)),
+                os.path.getsize(typed_path),
+            ),
+        ]
+
+    for name, load, dump, size in rows:
+        print(
+            f"{name:<8} load {load * 1000:>8.1f}ms  dump {dump * 1000:>8.1f}ms  "
+            f"size {size / 1024 / 1024:>6.2f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
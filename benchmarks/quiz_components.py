@@ -0,0 +1,117 @@
+"""
+Allocation benchmark for the quiz answer buttons.
+
+Simulates a burst of quizzes and compares the previous approach of a new
+``View`` with fresh ``Button`` objects for every question against the
+prebuilt ``StaticActionRow`` payloads, including the conversion to the
+component dicts that are sent to Discord.
+
+Run from the repository root:
+
+    python -m benchmarks.quiz_components --quizzes 5000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+from typing import Callable, List, Optional
+
+import disnake
+from disnake.ui.action_row import components_to_dict
+
+from quizbot.components import StaticActionRow
+from quizbot.quiz import QuizItem, load_prebuilt_items
+
+
+def view_per_question(item: QuizItem) -> tuple:
+    """The original create_view: a new View and Buttons for every question"""
+
+    answers = [item.correct] + item.incorrect
+    random.shuffle(answers)
+
+    view = disnake.ui.View()
+    for answer in answers:
+        view.add_item(
+            disnake.ui.Button(label=answer, style=disnake.ButtonStyle.primary)
+        )
+
+    return view, view.to_components()
+
+
+def prebuilt_payload(item: QuizItem) -> tuple:
+    """The current create_view: shuffled prebuilt payloads in a StaticActionRow"""
+
+    components = [StaticActionRow(random.sample(item.buttons, len(item.buttons)))]
+    return components, components_to_dict(components)
+
+
+def measure(
+    build: Callable[[QuizItem], tuple], items: List[QuizItem], quizzes: int
+) -> dict:
+    """
+    Every quiz in the burst is in flight at once, so the components for the
+    current question of each quiz are held until the whole question round
+    has been sent, like they would be while waiting for the answer clicks
+    """
+
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    held_max = 0
+    blocks_max = 0
+    start = time.perf_counter()
+
+    for item in items:
+        before = tracemalloc.take_snapshot()
+        held = [build(item) for _ in range(quizzes)]
+        after = tracemalloc.take_snapshot()
+
+        current, _ = tracemalloc.get_traced_memory()
+        held_max = max(held_max, current - baseline)
+        blocks_max = max(
+            blocks_max,
+            sum(s.count_diff for s in after.compare_to(before, "filename")),
+        )
+
+        for view, _ in held:
+            if isinstance(view, disnake.ui.View):
+                view.stop()
+        del held
+
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "elapsed": elapsed,
+        "peak": peak - baseline,
+        "held": held_max,
+        "blocks": blocks_max,
+    }
+
+
+async def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quizzes", type=int, default=5000)
+    opts = parser.parse_args(args)
+
+    items = list(load_prebuilt_items())
+    print(f"{opts.quizzes} quizzes x {len(items)} questions")
+
+    for name, build in (
+        ("view per question", view_per_question),
+        ("prebuilt payload", prebuilt_payload),
+    ):
+        result = measure(build, items, opts.quizzes)
+        print(
+            f"{name:<18} {result['elapsed']:>7.3f}s  "
+            f"held per round {result['held'] / 1024:>9.1f} KiB "
+            f"in {result['blocks']:>7} blocks  "
+            f"peak {result['peak'] / 1024:>9.1f} KiB"
+        )
+
+
+if __name__ == "__main__":
+    # View requires a running event loop
+    asyncio.run(main())
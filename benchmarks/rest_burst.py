@@ -0,0 +1,163 @@
+"""
+Burst benchmark for the REST connection pool.
+
+Starts a local stand-in for the Discord REST API that serves the routes
+QuizBot hits the most (interaction message edits, fetch_message and
+add_roles), then fires bursts of concurrent requests at it through the
+default aiohttp connector and through the ConnectorProfile built from the
+HTTP_* environment variables, so a profile change can be checked before
+it is deployed.
+
+Run from the repository root:
+
+    python -m benchmarks.rest_burst --requests 5000 --concurrency 250
+    HTTP_POOL_LIMIT=200 python -m benchmarks.rest_burst
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Optional
+
+import aiohttp
+from aiohttp import web
+
+from quizbot.connector import ConnectorProfile, create_connector
+
+API = "/api/v10"
+
+
+def create_app(latency: float) -> web.Application:
+    """Stand-in Discord REST server with a fixed artificial latency per request"""
+
+    async def edit_original(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        return web.json_response({"id": "1", "content": None, "components": []})
+
+    async def fetch_message(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        return web.json_response(
+            {"id": request.match_info["message_id"], "embeds": [], "components": []}
+        )
+
+    async def add_role(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        return web.Response(status=204)
+
+    app = web.Application()
+    app.router.add_patch(
+        API + "/webhooks/{app_id}/{token}/messages/@original", edit_original
+    )
+    app.router.add_get(
+        API + "/channels/{channel_id}/messages/{message_id}", fetch_message
+    )
+    app.router.add_put(
+        API + "/guilds/{guild_id}/members/{member_id}/roles/{role_id}", add_role
+    )
+    return app
+
+
+async def _request(session: aiohttp.ClientSession, base: str, i: int) -> float:
+    """Send one request, cycling through the three routes, and return its latency"""
+
+    start = time.perf_counter()
+    route = i % 3
+
+    if route == 0:
+        coro = session.patch(
+            f"{base}{API}/webhooks/1/token{i}/messages/@original", json={"content": "x"}
+        )
+    elif route == 1:
+        coro = session.get(f"{base}{API}/channels/1/messages/{i}")
+    else:
+        coro = session.put(f"{base}{API}/guilds/1/members/{i}/roles/1")
+
+    async with coro as resp:
+        await resp.read()
+
+    return time.perf_counter() - start
+
+
+async def run_burst(
+    base: str,
+    connector: aiohttp.BaseConnector,
+    requests: int,
+    concurrency: int,
+) -> dict:
+    """Fire ``requests`` requests at the stand-in, ``concurrency`` at a time"""
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def worker(i: int) -> None:
+        async with semaphore:
+            latencies.append(await _request(session, base, i))
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        # one warm request so both runs start with a resolved host
+        await _request(session, base, 0)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "elapsed": elapsed,
+        "throughput": requests / elapsed,
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p95": latencies[int(len(latencies) * 0.95)] * 1000,
+        "p99": latencies[int(len(latencies) * 0.99)] * 1000,
+        "mean": statistics.fmean(latencies) * 1000,
+    }
+
+
+def _print_result(name: str, result: dict) -> None:
+    print(
+        f"{name:<10} {result['throughput']:>10.0f} req/s  "
+        f"p50 {result['p50']:>7.2f}ms  p95 {result['p95']:>7.2f}ms  "
+        f"p99 {result['p99']:>7.2f}ms  mean {result['mean']:>7.2f}ms"
+    )
+
+
+async def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument(
+        "--latency", type=float, default=0.005, help="stand-in server latency (s)"
+    )
+    parser.add_argument("--port", type=int, default=0)
+    opts = parser.parse_args(args)
+
+    runner = web.AppRunner(create_app(opts.latency))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", opts.port)
+    await site.start()
+
+    port = site._server.sockets[0].getsockname()[1]
+    # use a hostname rather than the IP so resolver caching is exercised
+    base = f"http://localhost:{port}"
+
+    try:
+        default = await run_burst(
+            base, aiohttp.TCPConnector(), opts.requests, opts.concurrency
+        )
+        profile = await run_burst(
+            base,
+            create_connector(ConnectorProfile.from_env()),
+            opts.requests,
+            opts.concurrency,
+        )
+    finally:
+        await runner.cleanup()
+
+    print(f"{opts.requests} requests, concurrency {opts.concurrency}")
+    _print_result("default", default)
+    _print_result("profile", profile)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,153 @@
+"""
+Benchmark for the shared state backends.
+
+Starts a small local stand-in for a Redis server (only the commands the
+bot uses are implemented) and replays a click pattern against the
+in-process backend and the networked backend with and without its
+near-cache.  Each simulated user clicks "Start Quiz" several times in a
+row, like a member spamming the button.
+
+Run from the repository root:
+
+    python -m benchmarks.state_backend --users 2000 --clicks 5
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from quizbot.state import MemoryBackend, RedisBackend, StateBackend, _read_reply
+
+
+class StandInServer:
+    """Minimal RESP server supporting PING, GET, SET [NX] [PX], PTTL and DEL"""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.commands = 0
+
+    def _alive(self, key: bytes) -> Optional[Tuple[bytes, Optional[float]]]:
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self.data[key]
+            return None
+        return entry
+
+    def handle(self, command: List[bytes]) -> bytes:
+        self.commands += 1
+        name = command[0].upper()
+
+        if name == b"PING":
+            return b"+PONG\r\n"
+
+        if name == b"GET":
+            entry = self._alive(command[1])
+            if entry is None:
+                return b"$-1\r\n"
+            return b"$%d\r\n%s\r\n" % (len(entry[0]), entry[0])
+
+        if name == b"SET":
+            key, value, options = command[1], command[2], command[3:]
+            upper = [o.upper() for o in options]
+            if b"NX" in upper and self._alive(key) is not None:
+                return b"$-1\r\n"
+
+            expires = None
+            if b"PX" in upper:
+                ms = int(options[upper.index(b"PX") + 1])
+                expires = time.monotonic() + ms / 1000
+
+            self.data[key] = (value, expires)
+            return b"+OK\r\n"
+
+        if name == b"PTTL":
+            entry = self._alive(command[1])
+            if entry is None:
+                return b":-2\r\n"
+            if entry[1] is None:
+                return b":-1\r\n"
+            return b":%d\r\n" % int((entry[1] - time.monotonic()) * 1000)
+
+        if name == b"DEL":
+            deleted = sum(self.data.pop(key, None) is not None for key in command[1:])
+            return b":%d\r\n" % deleted
+
+        return b"-ERR unknown command\r\n"
+
+    async def serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                command = await _read_reply(reader)
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                writer.write(self.handle(command))
+
+                # only flush once the client has no more pipelined commands buffered
+                if not reader._buffer:
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def replay(backend: StateBackend, users: int, clicks: int) -> Tuple[float, int]:
+    """Replay the spam click pattern, returns elapsed seconds and accepted clicks"""
+
+    accepted = 0
+    start = time.perf_counter()
+
+    async def user(user_id: int) -> None:
+        nonlocal accepted
+        for _ in range(clicks):
+            if await backend.try_cooldown(str(user_id), 600) is None:
+                if await backend.acquire_session(str(user_id), 900):
+                    accepted += 1
+                    await backend.release_session(str(user_id))
+
+    await asyncio.gather(*(user(i) for i in range(users)))
+    return time.perf_counter() - start, accepted
+
+
+async def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--clicks", type=int, default=5)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="stand-in server latency (s)"
+    )
+    opts = parser.parse_args(args)
+
+    stand_in = StandInServer(opts.latency)
+    server = await asyncio.start_server(stand_in.serve, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    total = opts.users * opts.clicks
+    print(f"{opts.users} users x {opts.clicks} clicks = {total} clicks")
+
+    results = [("memory", MemoryBackend())]
+    for near_cache in (False, True):
+        backend = RedisBackend(
+            "127.0.0.1", port, near_cache=near_cache, prefix=f"bench{near_cache}:"
+        )
+        results.append((f"redis near_cache={near_cache}", backend))
+
+    async with server:
+        for name, backend in results:
+            elapsed, accepted = await replay(backend, opts.users, opts.clicks)
+            trips = getattr(backend, "round_trips", 0)
+            await backend.close()
+
+            print(
+                f"{name:<24} {total / elapsed:>10.0f} clicks/s  "
+                f"accepted {accepted:>6}  round trips {trips:>7}  "
+                f"({trips / total:.2f} per click)"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,286 @@
+"""
+Microbenchmark suite for the config, quiz and component hot paths.
+
+Each benchmark reports the median time per call and the peak memory
+allocated by a single call.  Results are compared against the committed
+baseline, failing when a hot path allocates more than the threshold allows.
+
+Allocations are deterministic for a given Python version, disnake version
+and config codec (msgspec or stdlib json), so they are what the check
+gates on.  The baseline records all three and the comparison is skipped
+when the codec or disnake version differ.  Timings vary between runs and machines
+and are only reported, --check-time also gates on them, ignoring changes
+smaller than --time-floor.  Runs offline, the config is written to a
+temporary directory.
+
+Run from the repository root:
+
+    python -m benchmarks.suite               # compare against benchmarks/baseline.json
+    python -m benchmarks.suite --save        # record a new baseline
+    python -m benchmarks.suite -k quizzed    # only matching benchmarks
+    python -m benchmarks.suite --check-time  # also fail on slower timings
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Tuple
+
+import disnake
+
+from quizbot import config, schema
+from quizbot.quiz import Quiz, QuizItem, load_prebuilt_items
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+EMBED = {
+    "thumbnail": {
+        "width": 1000,
+        "url": "https://cdn.discordapp.com/ephemeral-attachments/1/2/thumbnail.gif",
+        "proxy_url": "https://media.discordapp.net/ephemeral-attachments/1/2/thumbnail.gif",
+        "height": 1000,
+    },
+    "type": "rich",
+    "description": "You're a genius :brain: Having now passed the quiz, you've been allowed through the gates.",
+    "title": "Welcome!",
+}
+
+QUIZZED_SIZES = (10, 1_000, 100_000)
+
+
+def environment() -> Dict[str, str]:
+    """What the allocations depend on, stored alongside the baseline"""
+
+    return {
+        "python": platform.python_version(),
+        "codec": "json" if schema.msgspec is None else "msgspec",
+        "disnake": disnake.__version__,
+    }
+
+
+def setup_config(root: str) -> None:
+    """Point the config at an empty temporary directory and add the test guilds"""
+
+    config.GUILDS_PATH = os.path.join(root, "guilds")
+    config.CONFIG_PATH = os.path.join(root, "config.json")
+    config._store = None
+
+    for size in QUIZZED_SIZES:
+        guild = config.get_guild(size)
+        guild.correct = guild.incorrect = guild.quiz = dict(EMBED)
+        guild.quizzed = set(range(size))
+        config.dump_data(guild)
+
+
+def benchmarks() -> Dict[str, Callable[[], object]]:
+    """The benchmarked calls, keyed by name"""
+
+    member = SimpleNamespace(id=1, guild=SimpleNamespace(id=QUIZZED_SIZES[0]))
+    quiz = Quiz(None, member)
+    item: QuizItem = load_prebuilt_items()[0]
+    guild = config.get_guild(QUIZZED_SIZES[1])
+    embed = disnake.Embed.from_dict(dict(EMBED))
+
+    cases = {
+        "config.load_data": lambda: config.load_data(QUIZZED_SIZES[1]),
+        "config.dump_data": lambda: config.dump_data(guild),
+        "config.get_embed": lambda: config.get_embed(
+            QUIZZED_SIZES[0], _type="correct"
+        ),
+        "Quiz.__init__": lambda: Quiz(None, member),
+        "Quiz.load_quiz_items": quiz.load_quiz_items,
+        "Quiz.create_view": lambda: quiz.create_view(item),
+        "Quiz.build_embed": lambda: quiz.build_embed(item),
+        "Embed.from_dict round trip": lambda: disnake.Embed.from_dict(
+            embed.to_dict()
+        ),
+    }
+
+    for size in QUIZZED_SIZES:
+        # the last member in the list is the worst case for a list lookup
+        cases[f"config.check_quizzed_member[{size}]"] = (
+            lambda size=size: config.check_quizzed_member(size, size - 1)
+        )
+
+    return cases
+
+
+def measure(func: Callable[[], object], repeat: int) -> Tuple[float, int]:
+    """Returns the median seconds per call and the peak bytes allocated by one call"""
+
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    median = statistics.median(timer.repeat(repeat=repeat, number=number)) / number
+
+    func()  # make sure any lazy caches are already filled
+    peaks = []
+    for _ in range(3):
+        tracemalloc.start()
+        start, _ = tracemalloc.get_traced_memory()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak - start)
+
+    # the smallest peak leaves out one off allocations such as cache refills
+    return median, min(peaks)
+
+
+def compare(
+    results: Dict[str, dict],
+    baseline: Dict[str, dict],
+    threshold: float,
+    *,
+    time_floor: Optional[float] = None,
+) -> List[str]:
+    """
+    Returns a message for every benchmark that regressed past the threshold.
+    Timings are only compared when ``time_floor`` is given, and must also be
+    slower by more than that many seconds to count
+    """
+
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+
+        if (
+            time_floor is not None
+            and result["time"] > base["time"] * (1 + threshold)
+            and result["time"] - base["time"] > time_floor
+        ):
+            regressions.append(
+                f"{name}: time {_format_time(result['time'])} vs "
+                f"baseline {_format_time(base['time'])}"
+            )
+
+        # allow a little slack for tiny allocations that vary between runs
+        if result["peak"] > base["peak"] * (1 + threshold) + 256:
+            regressions.append(
+                f"{name}: peak {result['peak']} B vs baseline {base['peak']} B"
+            )
+
+    return regressions
+
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+
+    return f"{seconds / 1e-9:.0f}ns"
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-k", default="", help="only run benchmarks containing this")
+    parser.add_argument("--repeat", type=int, default=9)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--save", action="store_true", help="save the results as the baseline"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="allowed fractional regression before failing",
+    )
+    parser.add_argument(
+        "--check-time", action="store_true", help="also fail on slower timings"
+    )
+    parser.add_argument(
+        "--time-floor",
+        type=float,
+        default=50e-6,
+        help="seconds a timing must slow down by to count with --check-time",
+    )
+    opts = parser.parse_args(args)
+
+    results: Dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_config(tmp)
+
+        for name, func in benchmarks().items():
+            if opts.k not in name:
+                continue
+
+            seconds, peak = measure(func, opts.repeat)
+            results[name] = {"time": seconds, "peak": peak}
+            print(f"{name:<40} {_format_time(seconds):>10}  peak {peak:>9} B")
+
+    env = environment()
+
+    if opts.save:
+        baseline: Dict[str, dict] = {}
+        if os.path.exists(opts.baseline):
+            with open(opts.baseline) as f:
+                stored = json.load(f)
+
+            # keep the other benchmarks only if they were recorded the same way
+            if all(stored.get(key) == value for key, value in env.items()):
+                baseline = stored["benchmarks"]
+
+        baseline.update(results)
+        with open(opts.baseline, "w") as f:
+            json.dump({**env, "benchmarks": baseline}, f, indent=4, sort_keys=True)
+            f.write("\n")
+
+        print(f"Saved baseline to {opts.baseline}")
+        return 0
+
+    if not os.path.exists(opts.baseline):
+        print(f"No baseline at {opts.baseline}, run with --save to record one")
+        return 2
+
+    with open(opts.baseline) as f:
+        stored = json.load(f)
+
+    python = env["python"]
+    if stored["python"].rsplit(".", 1)[0] != python.rsplit(".", 1)[0]:
+        print(
+            f"\nWarning: baseline was recorded on Python {stored['python']}, "
+            f"allocations can differ on {python}"
+        )
+
+    # the codec and disnake change allocations outright (stdlib json peaks at
+    # several times msgspec's), so comparing would only report false regressions
+    mismatched = [
+        f"{key} {stored.get(key, 'unknown')} (this run has {env[key]})"
+        for key in ("codec", "disnake")
+        if stored.get(key) != env[key]
+    ]
+    if mismatched:
+        print(
+            f"\nSkipping the comparison, the baseline was recorded with "
+            f"{', '.join(mismatched)}.  Install the same versions (the fast "
+            f"extra for msgspec) or record a baseline here with --save"
+        )
+        return 0
+
+    regressions = compare(
+        results,
+        stored["benchmarks"],
+        opts.threshold,
+        time_floor=opts.time_floor if opts.check_time else None,
+    )
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) past {opts.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+
+    print(f"\nNo regressions past {opts.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -21,6 +21,9 @@ from loguru import logger
 
 from quizbot import config
 from quizbot.bot import QuizBot
+from quizbot.connector import ConnectorProfile
+from quizbot.log import setup_logging
+from quizbot.state import create_backend
 
 _intents = disnake.Intents.none()
 _intents.guilds = True
@@ -30,10 +33,21 @@ _intents.members = True
 async def main() -> None:
     """Create the bot, load the extensions, start the bot"""
 
+    setup_logging(config.log_level, serialize=config.log_json)
+
+    # open the guild config store now so any migration of the old
+    # config file happens before the bot starts handling events
+    config.store()
+
     # setting reload to true allows us to make changes within extension modules
     # and the bot will automatically reload that extension to prevent the need
     # to constantly restart the bot while making tweaks
-    bot: QuizBot = QuizBot(intents=_intents, reload=True)
+    bot: QuizBot = QuizBot(
+        intents=_intents,
+        reload=True,
+        connector_profile=ConnectorProfile.from_env(),
+        state=create_backend(config.state_url),
+    )
 
     try:
         bot.load_extensions()
@@ -0,0 +1,253 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Deque, Dict, Hashable, Optional, Tuple
+
+__all__ = (
+    "TokenBucket",
+    "AdmissionStats",
+    "Ticket",
+    "AdmissionController",
+)
+
+
+class TokenBucket:
+    """
+    Per-key token bucket rate limiter
+
+    Parameters
+    ----------
+    rate: :type:`int`
+        Number of tokens each key may spend per ``per`` seconds
+    per: :type:`float`
+        Seconds for a bucket to refill completely
+    max_keys: :type:`int`
+        Idle buckets are dropped once this many keys are being tracked
+    """
+
+    def __init__(self, rate: int, per: float, *, max_keys: int = 100_000) -> None:
+        self.rate = rate
+        self.per = per
+        self.max_keys = max_keys
+        self._buckets: Dict[Hashable, Tuple[float, float]] = {}
+
+    def consume(self, key: Hashable) -> bool:
+        """Take a token for the key, returns False if the bucket is empty"""
+
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (self.rate, now))
+        tokens = min(self.rate, tokens + (now - updated) * self.rate / self.per)
+
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            return False
+
+        if key not in self._buckets and len(self._buckets) >= self.max_keys:
+            self.purge(now)
+
+        self._buckets[key] = (tokens - 1, now)
+        return True
+
+    def purge(self, now: Optional[float] = None) -> None:
+        """Drop buckets that have refilled, they are the same as a new bucket"""
+
+        now = time.monotonic() if now is None else now
+        self._buckets = {
+            key: (tokens, updated)
+            for key, (tokens, updated) in self._buckets.items()
+            if tokens + (now - updated) * self.rate / self.per < self.rate
+        }
+
+
+@dataclass
+class AdmissionStats:
+    """Counters for what happened to "Start Quiz" clicks"""
+
+    clicks: int = 0
+    rate_limited: int = 0
+    on_cooldown: int = 0
+    missing_roles: int = 0
+    admitted: int = 0
+    queued: int = 0
+    queue_full: int = 0
+    queue_timeouts: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class Ticket:
+    """
+    A member's place in the quiz admission queue.
+
+    Attributes
+    ----------
+    guild_id: :type:`int`
+        The guild the quiz is being taken in
+    position: :type:`int`
+        1-based position in the waiting queue when the ticket was issued,
+        0 if the quiz was admitted straight away
+    """
+
+    def __init__(self, guild_id: int, position: int = 0) -> None:
+        self.guild_id = guild_id
+        self.position = position
+        self.admitted = position == 0
+        self._future: Optional[asyncio.Future] = None
+
+
+class AdmissionController:
+    """
+    Caps how many quizzes can run at once per guild and across the bot,
+    placing members over the cap in a FIFO waiting queue, and rate limits
+    clicks per member so that spam is rejected before any other work is done
+
+    Parameters
+    ----------
+    per_guild: :type:`int`
+        Maximum concurrent quizzes in a single guild
+    global_limit: :type:`int`
+        Maximum concurrent quizzes across all guilds
+    max_waiting: :type:`int`
+        Maximum number of members waiting in the queue
+    click_rate: :type:`Tuple[int, float]`
+        Clicks allowed per member, per number of seconds
+    """
+
+    def __init__(
+        self,
+        *,
+        per_guild: int = 25,
+        global_limit: int = 250,
+        max_waiting: int = 1000,
+        click_rate: Tuple[int, float] = (3, 10.0),
+    ) -> None:
+        self.per_guild = per_guild
+        self.global_limit = global_limit
+        self.max_waiting = max_waiting
+        self.clicks = TokenBucket(*click_rate)
+        self.stats = AdmissionStats()
+
+        self.active = 0
+        self._active_per_guild: Dict[int, int] = {}
+        self._waiting: Deque[Ticket] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiting)
+
+    def allow_click(self, member_id: int) -> bool:
+        """Count the click and check the member's click rate limit"""
+
+        self.stats.clicks += 1
+        if self.clicks.consume(member_id):
+            return True
+
+        self.stats.rate_limited += 1
+        return False
+
+    def _has_capacity(self, guild_id: int) -> bool:
+        return (
+            self.active < self.global_limit
+            and self._active_per_guild.get(guild_id, 0) < self.per_guild
+        )
+
+    def _start(self, ticket: Ticket) -> None:
+        self.active += 1
+        self._active_per_guild[ticket.guild_id] = (
+            self._active_per_guild.get(ticket.guild_id, 0) + 1
+        )
+        ticket.admitted = True
+
+    def request(self, guild_id: int) -> Optional[Ticket]:
+        """
+        Request a quiz slot in the guild.  The returned ticket is admitted
+        immediately if there is capacity, otherwise it is placed in the queue
+        and :meth:`wait` must be awaited.  Returns None if the queue is full
+        """
+
+        # waiting tickets are admitted as soon as a slot that fits them frees
+        # up, so anything still waiting is for a guild at its cap (or every
+        # slot is taken).  A request that fits can't jump ahead of waiting
+        # members of its own guild, and doesn't have to wait behind other guilds
+        if self._has_capacity(guild_id):
+            ticket = Ticket(guild_id)
+            self._start(ticket)
+            self.stats.admitted += 1
+            return ticket
+
+        if len(self._waiting) >= self.max_waiting:
+            self.stats.queue_full += 1
+            return None
+
+        ticket = Ticket(guild_id, position=len(self._waiting) + 1)
+        ticket._future = asyncio.get_running_loop().create_future()
+        self._waiting.append(ticket)
+        self.stats.queued += 1
+        return ticket
+
+    def position(self, ticket: Ticket) -> int:
+        """The ticket's current 1-based position in the queue, 0 if it
+        is no longer waiting"""
+
+        try:
+            return self._waiting.index(ticket) + 1
+        except ValueError:
+            return 0
+
+    async def wait(self, ticket: Ticket, timeout: Optional[float] = None) -> None:
+        """
+        Wait until the queued ticket is admitted.
+
+        Raises :class:`asyncio.TimeoutError` if it isn't admitted in time, in
+        which case the ticket is removed from the queue
+        """
+
+        if ticket.admitted:
+            return
+
+        try:
+            await asyncio.wait_for(asyncio.shield(ticket._future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if ticket.admitted:
+                # admitted at the same moment it timed out, give the slot back
+                self.release(ticket)
+            else:
+                self._waiting.remove(ticket)
+
+            if isinstance(e, asyncio.TimeoutError):
+                self.stats.queue_timeouts += 1
+            raise
+
+    def release(self, ticket: Ticket) -> None:
+        """Free the ticket's slot and admit the next waiting members that fit"""
+
+        if not ticket.admitted:
+            return
+
+        ticket.admitted = False
+        self.active -= 1
+        remaining = self._active_per_guild[ticket.guild_id] - 1
+        if remaining:
+            self._active_per_guild[ticket.guild_id] = remaining
+        else:
+            del self._active_per_guild[ticket.guild_id]
+
+        self._admit_waiting()
+
+    def _admit_waiting(self) -> None:
+        """Admit waiting tickets in FIFO order, skipping over any whose guild
+        is at its own cap so one busy guild can't block the others"""
+
+        if self.active >= self.global_limit or not self._waiting:
+            return
+
+        for ticket in list(self._waiting):
+            if self.active >= self.global_limit:
+                break
+
+            if self._has_capacity(ticket.guild_id):
+                self._waiting.remove(ticket)
+                self._start(ticket)
+                ticket._future.set_result(None)
@@ -1,12 +1,18 @@
+import asyncio
 import os
-from datetime import datetime
 from sys import version as sys_version
+from typing import Optional
 
 from disnake import __version__ as disnake_version
 from disnake.ext import commands
 from loguru import logger
 
 from quizbot import __version__ as bot_version
+from quizbot import config
+from quizbot.admission import AdmissionController
+from quizbot.connector import ConnectorProfile, create_connector
+from quizbot.state import MemoryBackend, StateBackend
+from quizbot.warmup import WarmupReport, warmup
 
 __all__ = ("QuizBot",)
 
@@ -14,27 +20,66 @@ __all__ = ("QuizBot",)
 class QuizBot(commands.InteractionBot):
     """Base bot instance"""
 
-    def __init__(self, **kwargs) -> None:
+    def __init__(
+        self,
+        *,
+        connector_profile: Optional[ConnectorProfile] = None,
+        state: Optional[StateBackend] = None,
+        admission: Optional[AdmissionController] = None,
+        **kwargs,
+    ) -> None:
+        # all REST traffic shares one configurable connection pool unless
+        # a connector was explicitly passed in
+        self.connector_profile = connector_profile or ConnectorProfile()
+        if kwargs.get("connector") is None:
+            kwargs["connector"] = create_connector(self.connector_profile)
+
         super().__init__(**kwargs)
 
+        # cooldowns and active quiz sessions, shared between processes
+        # when a networked backend is used
+        self.state: StateBackend = state or MemoryBackend()
+
+        # concurrent quiz limits and click rate limiting for this process
+        self.admission = admission or AdmissionController(
+            per_guild=config.max_quizzes_per_guild,
+            global_limit=config.max_quizzes,
+            max_waiting=config.max_waiting,
+            click_rate=config.click_rate,
+        )
+
+        self.warmup_report: Optional[WarmupReport] = None
+        self._warmup_task: Optional[asyncio.Task] = None
+
+    async def close(self) -> None:
+        if self._warmup_task is not None:
+            self._warmup_task.cancel()
+
+        await super().close()
+        await self.state.close()
+
     async def on_ready(self):
         """
         Function is called automatically when the bot has made
         it's connection to the Discord API
 
-        All we will do here is print some information about the bot
-        after it's successful connection.
+        All we will do here is log some information about the bot
+        after it's successful connection and start warming up the
+        guild caches in the background.
         """
 
-        print(
-            "----------------------------------------------------------------------\n"
-            f'Bot started at: {datetime.now().strftime("%m/%d/%Y - %H:%M:%S")}\n'
-            f"System Version: {sys_version}\n"
-            f"Disnake Version: {disnake_version}\n"
-            f"Bot Version: {bot_version}\n"
-            f"Connected to Discord as {self.user} ({self.user.id})\n"
-            "----------------------------------------------------------------------\n"
-        )
+        logger.bind(
+            system_version=sys_version,
+            disnake_version=disnake_version,
+            bot_version=bot_version,
+            user_id=self.user.id,
+        ).info(f"Connected to Discord as {self.user} ({self.user.id})")
+
+        # on_ready is called again after reconnects, only warm up once
+        if self._warmup_task is None:
+            self._warmup_task = asyncio.create_task(
+                warmup(self, concurrency=config.warmup_concurrency)
+            )
 
     def load_extensions(self) -> None:
         """
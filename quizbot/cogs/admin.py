@@ -1,9 +1,13 @@
+import asyncio
+import time
 from typing import Optional
 
 import disnake
 from disnake.ext import commands
-from quizbot import components, config
+from quizbot import components, config, log
 from quizbot.bot import QuizBot
+from quizbot.log import set_trace
+from quizbot.reconcile import ReconcileReport, RoleReconciler
 
 
 class Admin(commands.Cog):
@@ -15,6 +19,8 @@ class Admin(commands.Cog):
 
     def __init__(self, bot: QuizBot) -> None:
         self.bot = bot
+        # guilds that currently have a role reconciliation running
+        self.reconciling: set[int] = set()
 
     async def cog_slash_command_check(self, inter: disnake.AppCmdInter) -> bool:
         """A check that is invoked for every command within this cog extension
@@ -23,6 +29,12 @@ class Admin(commands.Cog):
         member = inter.author
         return member.guild_permissions.administrator or member == inter.guild.owner
 
+    async def cog_before_slash_command_invoke(self, inter: disnake.AppCmdInter) -> None:
+        """Called before every command within this cog, tags the command's log records
+        with the interaction's trace ID"""
+
+        set_trace(inter)
+
     async def cog_slash_command_error(
         self, inter: disnake.AppCmdInter, error: Exception
     ) -> None:
@@ -174,6 +186,128 @@ class Admin(commands.Cog):
             view=view,
         )
 
+    @commands.slash_command(name="stats")
+    @commands.default_member_permissions(administrator=True)
+    @commands.guild_only()  # prevents this command from being used outside of a server
+    async def stats(self, inter: disnake.AppCmdInter) -> None:
+        """View how many "Start Quiz" clicks were accepted, queued or rejected"""
+
+        admission = self.bot.admission
+        stats = admission.stats
+
+        embed = disnake.Embed(title="Quiz Stats")
+        embed.add_field(name="Clicks", value=stats.clicks)
+        embed.add_field(name="Rate limited", value=stats.rate_limited)
+        embed.add_field(name="On cooldown", value=stats.on_cooldown)
+        embed.add_field(name="Missing roles", value=stats.missing_roles)
+        embed.add_field(name="Started immediately", value=stats.admitted)
+        embed.add_field(name="Queued", value=stats.queued)
+        embed.add_field(name="Rejected (queue full)", value=stats.queue_full)
+        embed.add_field(name="Queue timeouts", value=stats.queue_timeouts)
+        embed.add_field(
+            name="Running now",
+            value=f"{admission.active} / {admission.global_limit}",
+        )
+        embed.add_field(name="Waiting now", value=admission.waiting)
+
+        if (warmup := self.bot.warmup_report) is not None:
+            status = f"{warmup.done} / {warmup.guilds} guilds"
+            if warmup.done == warmup.guilds:
+                status += f" in {warmup.duration:.1f}s"
+            embed.add_field(name="Startup warmup", value=status)
+
+        if log.sink is not None:
+            embed.add_field(name="Dropped log records", value=log.sink.dropped)
+
+        await inter.response.send_message(embed=embed, ephemeral=True)
+
+    @commands.slash_command(name="reconcile_roles")
+    @commands.default_member_permissions(administrator=True)
+    @commands.guild_only()  # prevents this command from being used outside of a server
+    async def reconcile_roles(
+        self,
+        inter: disnake.AppCmdInter,
+        revoke: Optional[bool] = False,
+        confirm: Optional[str] = None,
+    ) -> None:
+        """Give the quiz role to every member that passed the quiz but is missing it
+
+        Parameters
+        ----------
+        revoke: :type:`bool`
+            WARNING: removes the quiz role from EVERY member not recorded as passing, incl. roles given by hand
+        confirm: :type:`Optional[str]`
+            Type REVOKE to confirm removing roles when revoke is set
+        """
+
+        guild = inter.guild
+        role = guild.get_role(config.quiz_role)
+        if role is None:
+            return await inter.response.send_message(
+                "The quiz role could not be found in this server.", ephemeral=True
+            )
+
+        if guild.id in self.reconciling:
+            return await inter.response.send_message(
+                "Roles are already being reconciled in this server.", ephemeral=True
+            )
+
+        if revoke:
+            # passes were only recorded from when reconciliation was added, so an
+            # empty list means the history is missing, not that nobody passed
+            if not await asyncio.to_thread(config.get_quizzed, guild.id):
+                return await inter.response.send_message(
+                    "No quiz passes have been recorded in this server yet, so revoking "
+                    "would remove the quiz role from everyone.  Run without revoke instead.",
+                    ephemeral=True,
+                )
+
+            if confirm != "REVOKE":
+                return await inter.response.send_message(
+                    "Revoking removes the quiz role from every member not recorded as "
+                    "passing the quiz, including members who passed before passes were "
+                    "recorded and members given the role by hand.  Set confirm to REVOKE "
+                    "to go ahead.",
+                    ephemeral=True,
+                )
+
+        await inter.response.defer(ephemeral=True)
+        self.reconciling.add(guild.id)
+
+        # the interaction can only be edited for 15 minutes, large servers
+        # can take longer so progress after that is only logged
+        started = time.monotonic()
+
+        def describe(report: ReconcileReport) -> str:
+            return (
+                f"Scanned {report.scanned} members ({report.rate:.0f}/s). "
+                f"Granted {report.granted}, revoked {report.revoked}, failed {report.failed}."
+            )
+
+        async def progress(report: ReconcileReport) -> None:
+            if time.monotonic() - started < 840:
+                await inter.edit_original_message(f"Reconciling... {describe(report)}")
+
+        reconciler = RoleReconciler(guild, role, revoke=bool(revoke))
+        try:
+            report = await reconciler.run(progress)
+        except disnake.Forbidden:
+            report = reconciler.report
+            message = (
+                "Role reconciliation stopped, the bot isn't allowed to manage the quiz "
+                "role.  Move the bot's role above it and run the command again to "
+                f"resume. {describe(report)}"
+            )
+        else:
+            message = f"Role reconciliation finished. {describe(report)}"
+        finally:
+            self.reconciling.discard(guild.id)
+
+        if time.monotonic() - started < 840:
+            await inter.edit_original_message(message)
+        else:
+            await inter.channel.send(f"{inter.author.mention} {message}")
+
 
 def setup(bot: QuizBot) -> None:
     bot.add_cog(Admin(bot))
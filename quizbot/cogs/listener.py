@@ -1,20 +1,37 @@
+import asyncio
 import datetime
 
 import disnake
 from disnake.ext import commands
+from loguru import logger
 from quizbot import config
+from quizbot.admission import Ticket
 from quizbot.bot import QuizBot
+from quizbot.errors import StateBackendError
+from quizbot.log import sampler, set_trace
 from quizbot.quiz import Quiz
 
+# seconds a member must wait between quiz attempts
+COOLDOWN = 600
+
+# upper bound on how long a quiz session can be held, covering time spent in the
+# admission queue and at most 60 seconds per question.  This only matters if a
+# process dies mid quiz
+SESSION_TTL = 1200
+
+# seconds a member can wait in the admission queue.  Must stay well below
+# the 15 minute lifetime of the interaction token used to edit the message
+QUEUE_TIMEOUT = 600
+
+# seconds between updates of a queued member's position in line
+POSITION_REFRESH = 15
+
 
 class Listeners(commands.Cog):
     """Adds button/component listeners to the bot events"""
 
     def __init__(self, bot: QuizBot) -> None:
         self.bot = bot
-        self.cooldown = commands.CooldownMapping.from_cooldown(
-            1, 600, commands.BucketType.user
-        )  # 10 minutes cooldown
 
     @commands.Cog.listener("on_button_click")
     async def start_quiz_button_listener(
@@ -25,20 +42,46 @@ class Listeners(commands.Cog):
         if inter.component.custom_id != "begin_quiz":
             return
 
-        # check if the button click has the required two roles to use this button
-        roles = [inter.guild.get_role(int(role)) for role in config.required_roles]
-        role_mentions = " ".join(
-            [role.mention for role in roles[:-1]] + [f"& {roles[-1].mention}"]
-        )
+        admission = self.bot.admission
+        set_trace(inter)
+        log = logger.bind(guild_id=inter.guild.id, member_id=inter.author.id)
+
+        # drop clicks from members spamming the button before doing any other
+        # work.  They get no response, which Discord shows as a failed interaction
+        if not admission.allow_click(inter.author.id):
+            if (suppressed := sampler.sample("click_rate_limited")) is not None:
+                log.bind(suppressed=suppressed).info("Start Quiz click rate limited")
+            return
+
+        # check if the button click has the required two roles to use this button.
+        # the role mentions are only built when they're needed for the reply
+        if not all(inter.author.get_role(role) for role in config.required_roles):
+            admission.stats.missing_roles += 1
+            if (suppressed := sampler.sample("click_missing_roles")) is not None:
+                log.bind(suppressed=suppressed).info("Start Quiz click missing roles")
+
+            mentions = [f"<@&{role}>" for role in config.required_roles]
+            role_mentions = " ".join(mentions[:-1] + [f"& {mentions[-1]}"])
 
-        if not all(role in inter.author.roles for role in roles):
             return await inter.response.send_message(
                 f"You'll need to have both {role_mentions} roles assigned to you before you can take this quiz. Go chat in <#962390006972944418> to receive enough XP to be assigned the Scoundrel role.",
                 ephemeral=True,
             )
 
-        # check if the button clicker is currently on cooldown
-        if retry_after := self.cooldown.update_rate_limit(inter):
+        # check if the button clicker is currently on cooldown. The cooldown is
+        # stored in the shared state so it applies across all bot processes
+        try:
+            retry_after = await self.bot.state.try_cooldown(
+                str(inter.author.id), COOLDOWN
+            )
+        except StateBackendError:
+            return await self.state_unavailable(inter)
+
+        if retry_after:
+            admission.stats.on_cooldown += 1
+            if (suppressed := sampler.sample("click_on_cooldown")) is not None:
+                log.bind(suppressed=suppressed).info("Start Quiz click on cooldown")
+
             retry = disnake.utils.utcnow() + datetime.timedelta(seconds=retry_after)
             retry = disnake.utils.format_dt(retry, "R")
             return await inter.response.send_message(
@@ -46,16 +89,121 @@ class Listeners(commands.Cog):
                 ephemeral=True,
             )
 
+        # prevent the member from running more than one quiz at the same time
+        session = str(inter.author.id)
+        try:
+            acquired = await self.bot.state.acquire_session(session, SESSION_TTL)
+        except StateBackendError:
+            return await self.state_unavailable(inter)
+
+        if not acquired:
+            return await inter.response.send_message(
+                "You already have a quiz in progress.", ephemeral=True
+            )
+
+        try:
+            ticket = admission.request(inter.guild.id)
+            if ticket is None:
+                log.warning("Quiz admission queue is full")
+                await self.clear_cooldown(inter)
+                return await inter.response.send_message(
+                    "Too many members are taking the quiz right now. Please try again in a few minutes.",
+                    ephemeral=True,
+                )
+
+            try:
+                await self.run_quiz(inter, ticket)
+            finally:
+                admission.release(ticket)
+        finally:
+            try:
+                await self.bot.state.release_session(session)
+            except StateBackendError:
+                # the session expires on its own after SESSION_TTL
+                log.exception("Could not release quiz session")
+
+    async def state_unavailable(self, inter: disnake.MessageInteraction) -> None:
+        """Reply to a click that couldn't be checked because the shared state is down"""
+
+        logger.bind(guild_id=inter.guild.id, member_id=inter.author.id).exception(
+            "State backend unavailable"
+        )
         await inter.response.send_message(
-            "Preparing quiz.  Please do not close this message", ephemeral=True
+            "The quiz is unavailable right now. Please try again in a few minutes.",
+            ephemeral=True,
         )
+
+    async def clear_cooldown(self, inter: disnake.MessageInteraction) -> None:
+        """Give back the cooldown of a member that was turned away before their
+        quiz could start, so they aren't locked out without having taken it"""
+
+        try:
+            await self.bot.state.clear_cooldown(str(inter.author.id))
+        except StateBackendError:
+            logger.exception("Could not clear quiz cooldown")
+
+    async def show_position(
+        self, inter: disnake.MessageInteraction, ticket: Ticket
+    ) -> None:
+        """Keep the queued message's position in line up to date until cancelled"""
+
+        position = ticket.position
+        while True:
+            await asyncio.sleep(POSITION_REFRESH)
+
+            current = self.bot.admission.position(ticket)
+            if not current or current == position:
+                continue
+
+            position = current
+            try:
+                await inter.edit_original_message(queued_message(position))
+            except disnake.HTTPException:
+                logger.bind(position=position).warning(
+                    "Could not update queue position"
+                )
+
+    async def run_quiz(self, inter: disnake.MessageInteraction, ticket: Ticket) -> None:
+        """Wait for the ticket to be admitted if it was queued, then run the quiz"""
+
+        if not ticket.admitted:
+            logger.bind(position=ticket.position).info("Quiz queued")
+            await inter.response.send_message(
+                queued_message(ticket.position), ephemeral=True
+            )
+
+            refresh = asyncio.create_task(self.show_position(inter, ticket))
+            try:
+                await self.bot.admission.wait(ticket, timeout=QUEUE_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.info("Quiz queue wait timed out")
+                await self.clear_cooldown(inter)
+                return await inter.edit_original_message(
+                    "Sorry, the quiz is still too busy. Please try again later."
+                )
+            finally:
+                refresh.cancel()
+
+            await inter.edit_original_message(
+                "Preparing quiz.  Please do not close this message"
+            )
+        else:
+            await inter.response.send_message(
+                "Preparing quiz.  Please do not close this message", ephemeral=True
+            )
+
         message = await inter.original_message()
 
         quiz = Quiz(message, inter.author)
         quiz.bot = self.bot
         await quiz.start_quiz()
 
-        return
+
+def queued_message(position: int) -> str:
+    return (
+        f"Lots of members are taking the quiz right now. You are #{position} in line, "
+        "your quiz will start automatically.  Please do not close this message"
+    )
 
 
 def setup(bot: QuizBot) -> None:
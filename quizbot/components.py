@@ -1,12 +1,16 @@
-from typing import List, Literal
+from typing import Any, Dict, List, Literal
 
 import disnake
+from loguru import logger
 
 from quizbot import config
+from quizbot.log import set_trace
 
 __all__ = (
     "default_embed",
+    "start_quiz_components",
     "EditEmbedButtons",
+    "StaticActionRow",
 )
 
 
@@ -18,6 +22,45 @@ def default_embed() -> disnake.Embed:
     return embed
 
 
+def start_quiz_components() -> List[disnake.ui.Button]:
+    """The persistent "Start Quiz" button handled by the Listeners cog"""
+
+    return [
+        disnake.ui.Button(
+            label="Start Quiz",
+            style=disnake.ButtonStyle.primary,
+            custom_id="begin_quiz",
+        )
+    ]
+
+
+class StaticActionRow(disnake.ui.ActionRow):
+    """
+    An action row that sends prebuilt component payloads as-is.
+
+    Lets hot paths reuse component dicts that were built once instead of
+    constructing new ``Button`` objects (and a ``View``) for every message.
+    Clicks on these components must be handled by ``custom_id`` through
+    listeners or ``wait_for`` since there is no view to dispatch them
+
+    Parameters
+    ----------
+    components: :type:`List[Dict[str, Any]]`
+        The raw component payloads to place in this row
+    """
+
+    def __init__(self, components: List[Dict[str, Any]]):
+        super().__init__()
+        self._payload = {"type": 1, "components": components}
+
+    @property
+    def width(self) -> int:
+        return len(self._payload["components"])
+
+    def to_component_dict(self) -> Dict[str, Any]:
+        return self._payload
+
+
 class EditEmbed(disnake.ui.Modal):
     """Modal for editing the embed body"""
 
@@ -48,6 +91,7 @@ class EditEmbed(disnake.ui.Modal):
     async def callback(self, interaction: disnake.ModalInteraction) -> None:
         """Callback for this modal"""
 
+        set_trace(interaction)
         title = interaction.text_values.get("title")
         body = interaction.text_values.get("body")
 
@@ -72,6 +116,7 @@ class EditEmbedButtons(disnake.ui.View):
     ) -> None:
         """Callback for edit embed button"""
 
+        set_trace(interaction)
         modal = EditEmbed()
         modal.embed = interaction.message.embeds[0]
 
@@ -83,6 +128,7 @@ class EditEmbedButtons(disnake.ui.View):
     ) -> None:
         """Callback for save embed button"""
 
+        set_trace(interaction)
         embed = interaction.message.embeds[0]
 
         await interaction.response.edit_message(
@@ -93,6 +139,9 @@ class EditEmbedButtons(disnake.ui.View):
 
         # save the updated embed
         config.update_embed(embed, guild_id=interaction.guild.id, _type=self.type)
+        logger.bind(guild_id=interaction.guild.id, embed_type=self.type).info(
+            "Embed saved"
+        )
 
         # if type is 'quiz' we also need to make sure to store the channel and message ID
         # if it doesn't already exist or update the message embed if it does exist
@@ -100,27 +149,23 @@ class EditEmbedButtons(disnake.ui.View):
         if self.type == "quiz":
 
             message_id, channel_id = config.get_quiz_message(interaction.guild.id)
+            channel = (
+                interaction.guild.get_channel(channel_id) if channel_id else None
+            )
 
-            if message_id is not None and channel_id is not None:
+            if message_id is not None and channel is not None:
+                # the stored message is checked on startup, so edit it directly
+                # rather than fetching it first
                 try:
-                    channel = interaction.guild.get_channel(channel_id)
-                    message = await channel.fetch_message(message_id)
-                except disnake.NotFound:
-                    pass  # channel or message wasn't found, so just skip edit and create a new message
-
-                else:
+                    message = channel.get_partial_message(message_id)
                     return await message.edit(embed=embed)
-
-            button = [
-                disnake.ui.Button(
-                    label="Start Quiz",
-                    style=disnake.ButtonStyle.primary,
-                    custom_id="begin_quiz",
-                )
-            ]
+                except disnake.NotFound:
+                    pass  # message wasn't found, so just skip edit and create a new message
 
             # if no message or channel ID, we'll send a new message and store the IDs here
-            message = await interaction.channel.send(embed=embed, components=button)
+            message = await interaction.channel.send(
+                embed=embed, components=start_quiz_components()
+            )
             config.update_quiz_message(
                 interaction.guild.id, interaction.channel.id, message.id
             )
@@ -132,6 +177,7 @@ class EditEmbedButtons(disnake.ui.View):
     ) -> None:
         """Callback for cancel emebd button"""
 
+        set_trace(interaction)
         await interaction.response.edit_message(
             "Customization has been cancelled.", view=self.clear_items()
         )
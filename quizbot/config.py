@@ -1,19 +1,26 @@
-import json
+import copy
 import os
-from typing import Literal, Tuple
+from typing import Literal, Optional, Set, Tuple
 
 import disnake
 
 from quizbot import components
+from quizbot.schema import GuildConfig
+from quizbot.store import GuildStore
 
 __all__ = (
     "token",
+    "state_url",
     "required_roles",
+    "get_guild",
     "update_embed",
     "get_embed",
     "get_quiz_message",
     "update_quiz_message",
     "add_to_quizzed",
+    "get_quizzed",
+    "get_reconcile_checkpoint",
+    "update_reconcile_checkpoint",
     "check_quizzed_member",
 )
 
@@ -21,6 +28,16 @@ __all__ = (
 # bot token loaded from the environment variables
 token = os.getenv("TOKEN")
 
+# shared state (cooldowns, active quizzes) backend url loaded from the environment
+# variables.  Set to a redis:// url when running more than one bot process,
+# otherwise the state is kept in memory
+state_url = os.getenv("STATE_URL")
+
+# logging level and format loaded from the environment variables.
+# records are written as JSON lines unless LOG_JSON is set to 0
+log_level = os.getenv("LOG_LEVEL", "INFO")
+log_json = os.getenv("LOG_JSON", "1") not in ("0", "false")
+
 # required roles to start the quiz.
 # list of role Ids that would be checked on_button_click
 # user needs all roles in this list to start the quiz
@@ -29,6 +46,22 @@ required_roles = [1026541703613653052, 1028000393751429130]  # change examples
 # role to be given on successful completion of the quiz
 quiz_role = 1026541741769236580
 
+# admission control for the "Start Quiz" button.
+# quizzes that can run at the same time in one server and across all servers,
+# members over either limit wait in a queue of up to max_waiting members
+max_quizzes_per_guild = 25
+max_quizzes = 250
+max_waiting = 1000
+
+# "Start Quiz" clicks allowed per member, per number of seconds
+click_rate = (3, 10.0)
+
+# number of guilds checked at the same time by the startup warmup
+warmup_concurrency = 8
+
+# number of guild configs kept in memory
+config_cache_size = 1000
+
 
 """
 Some basic config load,
@@ -37,16 +70,43 @@ Do not mess with this section
 """
 
 
-def load_data() -> dict[str, str]:
-    """Loads all data from the json"""
-    with open("quizbot/data/config.json") as f:
-        return json.load(f)
+# location of the stored guild configs, one file per guild
+GUILDS_PATH = "quizbot/data/guilds"
+
+# the old single file config, migrated to GUILDS_PATH at startup
+CONFIG_PATH = "quizbot/data/config.json"
+
+# guild configs loaded lazily and kept in memory.  Changes are written straight
+# away and merged with what other bot processes have written, see GuildStore
+_store: Optional[GuildStore] = None
+
+
+def store() -> GuildStore:
+    """Returns the guild config store, migrating the old config file when it is
+    first created.  Called at startup so the migration doesn't happen mid click"""
+    global _store
+
+    if _store is None:
+        _store = GuildStore(GUILDS_PATH, default_config, max_size=config_cache_size)
+        _store.migrate_single_file(CONFIG_PATH)
+
+    return _store
+
+
+def load_data(guild_id: int) -> Optional[GuildConfig]:
+    """Loads the guild's data from its json file"""
+    return store().read(guild_id)
+
+
+def dump_data(data: GuildConfig) -> None:
+    """Dumps the guild's data back into its json file"""
+    store().write(data)
+
 
+def get_guild(guild_id: int) -> GuildConfig:
+    """Returns the guild's config, creating a default one if it doesn't exist"""
 
-def dump_data(data: dict[str, dict]) -> None:
-    """Dumps the data back into the json file"""
-    with open("quizbot/data/config.json", "w") as f:
-        json.dump(data, f, indent=4)
+    return store().get(guild_id)
 
 
 def update_embed(
@@ -56,115 +116,102 @@ def update_embed(
     _type: Literal["correct", "incorrect", "quiz"]
 ) -> None:
     """Add the updated embed to the config file"""
-    data = load_data()
-    guild = data.get(str(guild_id))
 
-    if guild is None:
-        data[str(guild_id)] = default_config()
-
-    guild[_type] = embed.to_dict()
-    dump_data(data)
+    data = embed.to_dict()
+    store().update(guild_id, lambda guild: setattr(guild, _type, data))
 
 
 def get_embed(
     guild_id: int, *, _type: Literal["correct", "incorrect", "quiz"]
 ) -> disnake.Embed:
-    """Fetches the embed as dict from the config.json and converts it back to an Embed and returns it"""
+    """Fetches the embed as dict from the config and converts it back to an Embed and returns it"""
 
-    data = load_data()
-    guild = data.get(str(guild_id))
+    # the stored dict is copied since Embed keeps references to the nested dicts
+    embed_as_dict = getattr(get_guild(guild_id), _type)
+    return disnake.Embed.from_dict(copy.deepcopy(embed_as_dict))
 
-    if guild is None:
-        data[str(guild_id)] = default_config()
-        dump_data(data)
 
-    embed_as_dict = data[str(guild_id)][_type]
-    return disnake.Embed.from_dict(embed_as_dict)
+def get_quiz_message(guild_id: int) -> Tuple[Optional[int], Optional[int]]:
 
+    guild = get_guild(guild_id)
+    return (guild.quiz_message_id, guild.quiz_channel_id)
 
-def get_quiz_message(guild_id: int) -> Tuple:
 
-    data = load_data()
-    guild = data.get(str(guild_id))
+def update_quiz_message(
+    guild_id: int, channel_id: Optional[int], message_id: Optional[int]
+) -> None:
+    """Update the channel,and message stored IDs for the quiz starting message"""
 
-    if guild is None:
-        data[str(guild_id)] = default_config()
-        dump_data(data)
-        return None, None
+    def change(guild: GuildConfig) -> None:
+        guild.quiz_message_id = message_id
+        guild.quiz_channel_id = channel_id
 
-    message = data[str(guild_id)].get("quiz_message_id")
-    channel = data[str(guild_id)].get("quiz_channel_id")
+    store().update(guild_id, change)
 
-    return (message, channel)
 
+def add_to_quizzed(guild_id: int, member_id: int) -> None:
+    """Add the member to the quizzed members config"""
 
-def update_quiz_message(guild_id: int, channel_id: int, message_id: int) -> None:
-    """Update the channel,and message stored IDs for the quiz starting message"""
+    # added to the latest stored list so members recorded by other
+    # processes aren't lost, the reconciliation relies on this record
+    store().update(guild_id, lambda guild: guild.quizzed.add(member_id))
 
-    data = load_data()
-    guild = data.get(str(guild_id))
 
-    if guild is None:
-        data[str(guild_id)] = default_config()
+def get_quizzed(guild_id: int) -> Set[int]:
+    """Returns a copy of the IDs of the members that have passed the quiz,
+    including members recorded by other processes"""
 
-    data[str(guild_id)]["quiz_message_id"] = message_id
-    data[str(guild_id)]["quiz_channel_id"] = channel_id
+    return set(store().get(guild_id).quizzed)
 
-    dump_data(data)
 
+def get_reconcile_checkpoint(guild_id: int, *, revoke: bool = False) -> Optional[int]:
+    """Returns the member ID an interrupted role reconciliation should resume after.
 
-def add_to_quizzed(guild_id: int, member_id: int) -> None:
-    """Add the member to the quizzed members config"""
-    data = load_data()
-    guild = data.get(str(guild_id))
+    A revoking run doesn't resume from a grant-only run's checkpoint, since the
+    members before it were never checked for roles to revoke"""
 
-    if guild is None:
-        data[str(guild_id)] = default_config()
+    guild = store().get(guild_id)
+    if revoke and not guild.reconcile_revoke:
+        return None
 
-    data[str(guild_id)]["quizzed"].append(member_id)
-    dump_data(data)
+    return guild.reconcile_after
 
 
-def default_config():
-    return {
-        "quiz_message_id": None,
-        "quiz_channel_id": None,
-        "correct": components.default_embed().to_dict(),
-        "incorrect": components.default_embed().to_dict(),
-        "quiz": components.default_embed().to_dict(),
-        "quizzed": [],
-    }
+def update_reconcile_checkpoint(
+    guild_id: int, member_id: Optional[int], *, revoke: bool = False
+) -> None:
+    """Store the last member ID handled by the role reconciliation, None once finished"""
+
+    def change(guild: GuildConfig) -> None:
+        guild.reconcile_after = member_id
+        guild.reconcile_revoke = revoke and member_id is not None
+
+    store().update(guild_id, change)
+
+
+def default_config(guild_id: int) -> GuildConfig:
+    return GuildConfig(
+        guild_id=guild_id,
+        correct=components.default_embed().to_dict(),
+        incorrect=components.default_embed().to_dict(),
+        quiz=components.default_embed().to_dict(),
+    )
 
 
 def check_quizzed_member(guild_id: int, member_id: int) -> bool:
     """Check if the member_id exists in the list of quizzed members
     for the selected guild"""
 
-    data = load_data()
-    guild = data.get(str(guild_id))
-
-    if guild is None:
-        data[str(guild_id)] = default_config()
-        dump_data(data)
-
-    return member_id in data[str(guild_id)]["quizzed"]
+    return member_id in get_guild(guild_id).quizzed
 
 
 def get_correct_embed(guild_id: int) -> disnake.Embed:
     """Gets the correct embed from config"""
 
-    data = load_data()
-    guild = data.get(str(guild_id))
-
-    embed_as_dict = guild.get("correct")
-    return disnake.Embed.from_dict(embed_as_dict)
+    return get_embed(guild_id, _type="correct")
 
 
 def get_incorrect_embed(guild_id: int) -> disnake.Embed:
     """Gets the correct embed from config"""
 
-    data = load_data()
-    guild = data.get(str(guild_id))
-
-    embed_as_dict = guild.get("incorrect")
-    return disnake.Embed.from_dict(embed_as_dict)
+    return get_embed(guild_id, _type="incorrect")
@@ -0,0 +1,112 @@
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import aiohttp
+from aiohttp.resolver import DefaultResolver
+
+try:
+    from aiohttp.resolver import AsyncResolver
+except ImportError:
+    AsyncResolver = None
+
+__all__ = (
+    "ConnectorProfile",
+    "create_connector",
+)
+
+
+@dataclass(frozen=True)
+class ConnectorProfile:
+    """
+    Settings for the connection pool that is shared by all REST traffic
+    the bot sends to Discord (message edits, fetches, role updates, etc.)
+
+    The defaults are aiohttp's own, benchmarks/rest_burst.py showed no
+    consistent gain from changing them.  The profile exists so the pool
+    can be adjusted per deployment through the ``HTTP_*`` environment
+    variables without code changes.
+
+    TCP_NODELAY is not configurable here, asyncio and aiohttp already
+    set it on every connection.
+
+    Attributes
+    ----------
+    limit: :type:`int`
+        Total number of simultaneous connections in the pool (0 for no limit)
+
+    limit_per_host: :type:`int`
+        Simultaneous connections to a single host (0 for no limit).  Nearly
+        all traffic goes to discord.com, so ``limit`` is usually what applies
+
+    keepalive_timeout: :type:`float`
+        Seconds an idle connection is kept open for reuse
+
+    dns_cache_ttl: :type:`Optional[int]`
+        Seconds to cache resolved host addresses.  0 disables the cache,
+        None caches forever
+
+    async_resolver: :type:`bool`
+        Use aiodns for lookups when it is installed instead of the
+        thread pool based resolver
+    """
+
+    limit: int = 100
+    limit_per_host: int = 0
+    keepalive_timeout: float = 15.0
+    dns_cache_ttl: Optional[int] = 10
+    async_resolver: bool = True
+
+    @classmethod
+    def from_env(cls) -> "ConnectorProfile":
+        """
+        Create a profile using any ``HTTP_*`` overrides found in the
+        environment variables, falling back to the defaults above.
+
+        ``HTTP_DNS_CACHE_TTL=0`` disables DNS caching
+        """
+
+        default = cls()
+
+        return cls(
+            limit=int(os.getenv("HTTP_POOL_LIMIT", default.limit)),
+            limit_per_host=int(
+                os.getenv("HTTP_POOL_LIMIT_PER_HOST", default.limit_per_host)
+            ),
+            keepalive_timeout=float(
+                os.getenv("HTTP_KEEPALIVE_TIMEOUT", default.keepalive_timeout)
+            ),
+            dns_cache_ttl=int(os.getenv("HTTP_DNS_CACHE_TTL", default.dns_cache_ttl)),
+            async_resolver=os.getenv("HTTP_ASYNC_RESOLVER", "1") not in ("0", "false"),
+        )
+
+
+def create_connector(profile: ConnectorProfile) -> aiohttp.TCPConnector:
+    """
+    Build the pooled connector described by the profile.
+
+    Must be called from within a running event loop
+
+    Parameters
+    ----------
+    profile: :type:`ConnectorProfile`
+        The pool settings to apply
+    """
+
+    if profile.async_resolver and AsyncResolver is not None:
+        try:
+            resolver = AsyncResolver()
+        except RuntimeError:
+            # aiodns isn't installed
+            resolver = DefaultResolver()
+    else:
+        resolver = DefaultResolver()
+
+    return aiohttp.TCPConnector(
+        limit=profile.limit,
+        limit_per_host=profile.limit_per_host,
+        keepalive_timeout=profile.keepalive_timeout,
+        use_dns_cache=profile.dns_cache_ttl != 0,
+        ttl_dns_cache=profile.dns_cache_ttl,
+        resolver=resolver,
+    )
@@ -4,3 +4,11 @@ class GuildDoesNotExist(Exception):
 
 class NoEmbedConfigured(Exception):
     pass
+
+
+class StateBackendError(Exception):
+    pass
+
+
+class InvalidConfig(Exception):
+    pass
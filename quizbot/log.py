@@ -0,0 +1,204 @@
+import atexit
+import queue
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, TextIO
+
+import disnake
+from loguru import logger
+
+from quizbot.admission import TokenBucket
+
+__all__ = (
+    "trace_id",
+    "set_trace",
+    "BatchingSink",
+    "sink",
+    "Sampler",
+    "sampler",
+    "setup_logging",
+)
+
+
+# trace ID of the interaction currently being handled.  Each event handler
+# runs in its own task, so this is local to the interaction it was set for
+trace_id: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+
+
+def set_trace(interaction: disnake.Interaction) -> str:
+    """Use the interaction's ID as the trace ID for every log record
+    made while handling it, and return the trace ID"""
+
+    trace = f"{interaction.id:x}"
+    trace_id.set(trace)
+    return trace
+
+
+def _add_trace(record: dict) -> None:
+    record["extra"].setdefault("trace_id", trace_id.get())
+
+
+class BatchingSink:
+    """
+    Loguru sink that hands formatted records to a background thread
+    which writes them to the stream in batches.
+
+    Logging from the event loop only costs a queue put.  If the queue fills
+    up (the stream can't keep up) new records are dropped and counted
+    rather than blocking the loop.  Drops are reported with a warning
+    record once the backlog has been written, and when the sink stops.
+
+    Loguru's ``enqueue=True`` is not used because it pickles every record
+    through a multiprocessing pipe and writes them one at a time.  When the
+    stream stalls the pipe fills up and logging blocks the event loop, where
+    this sink drops records instead, and it writes in batches
+
+    Parameters
+    ----------
+    stream: :type:`TextIO`
+        Where the records are written, stderr by default
+    batch_size: :type:`int`
+        Maximum records written per write call
+    interval: :type:`float`
+        Maximum seconds a record waits before being written
+    max_queued: :type:`int`
+        Records buffered before new ones are dropped
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        stream: TextIO = sys.stderr,
+        *,
+        batch_size: int = 256,
+        interval: float = 0.25,
+        max_queued: int = 100_000,
+    ) -> None:
+        self.stream = stream
+        self.batch_size = batch_size
+        self.interval = interval
+        self.dropped = 0
+        self._reported = 0
+
+        self._queue: queue.Queue = queue.Queue(max_queued)
+        self._thread = threading.Thread(
+            target=self._run, name="quizbot-log-sink", daemon=True
+        )
+        self._thread.start()
+
+    def __call__(self, message: str) -> None:
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            batch: List[str] = [self._queue.get()]
+            stop = batch[0] is self._STOP
+
+            # collect whatever else arrives within the interval, up to a batch.
+            # The deadline is fixed per batch so a steady trickle of records
+            # can't keep pushing the write back
+            deadline = time.monotonic() + self.interval
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    message = self._queue.get(
+                        timeout=max(0, deadline - time.monotonic())
+                    )
+                except queue.Empty:
+                    break
+
+                if message is self._STOP:
+                    stop = True
+                else:
+                    batch.append(message)
+
+            messages = [m for m in batch if m is not self._STOP]
+            if messages:
+                self.stream.write("".join(messages))
+                self.stream.flush()
+
+            if stop:
+                return
+
+            if self.dropped > self._reported:
+                # logged through the sink itself, so it comes out in the same format
+                dropped, self._reported = self.dropped - self._reported, self.dropped
+                logger.bind(dropped=dropped, dropped_total=self.dropped).warning(
+                    f"Log sink dropped {dropped} records, the stream could not keep up"
+                )
+
+    def stop(self) -> None:
+        """Write any queued records and stop the background thread"""
+
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+
+            if self.dropped:
+                self.stream.write(f"Log sink dropped {self.dropped} records in total\n")
+                self.stream.flush()
+
+
+class Sampler:
+    """
+    Rate limits high volume log events, such as per-click logs during a raid,
+    so that only a few records are written per key per interval.
+
+    Parameters
+    ----------
+    rate: :type:`int`
+        Records allowed per key, per ``per`` seconds
+    per: :type:`float`
+        Seconds over which ``rate`` records are allowed
+    """
+
+    def __init__(self, rate: int = 5, per: float = 10.0) -> None:
+        self._bucket = TokenBucket(rate, per, max_keys=1000)
+        self._suppressed: Dict[str, int] = {}
+
+    def sample(self, key: str) -> Optional[int]:
+        """
+        Returns None if the event should not be logged, otherwise the number of
+        events for the key that were suppressed since the last one logged
+        """
+
+        if self._bucket.consume(key):
+            return self._suppressed.pop(key, 0)
+
+        self._suppressed[key] = self._suppressed.get(key, 0) + 1
+        return None
+
+
+# shared sampler for high volume events
+sampler = Sampler()
+
+# the sink installed by setup_logging, None until it is called
+sink: Optional[BatchingSink] = None
+
+
+def setup_logging(level: str = "INFO", *, serialize: bool = True) -> BatchingSink:
+    """
+    Replace loguru's default synchronous stderr sink with the batching sink.
+
+    Parameters
+    ----------
+    level: :type:`str`
+        The minimum level of records to write
+    serialize: :type:`bool`
+        Write each record as a line of JSON instead of plain text
+    """
+
+    global sink
+    sink = BatchingSink()
+
+    logger.remove()
+    logger.configure(patcher=_add_trace)
+    logger.add(sink, level=level, serialize=serialize)
+
+    atexit.register(sink.stop)
+    return sink
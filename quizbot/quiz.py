@@ -1,14 +1,18 @@
 import asyncio
+import functools
 import json
+import os
 import random
-from dataclasses import dataclass
-from typing import List
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Tuple
 
 import disnake
+from loguru import logger
 from typing_extensions import Self
 
 from quizbot import config
 from quizbot.bot import QuizBot
+from quizbot.components import StaticActionRow
 
 
 def load_questions():
@@ -27,18 +31,62 @@ class QuizItem:
     correct: str
     incorrect: List[str]
 
+    # prebuilt answer button payloads, only their order changes between quizzes
+    buttons: List[Dict[str, Any]] = field(default_factory=list, repr=False)
+    correct_id: str = field(default="", repr=False)
+    answer_ids: FrozenSet[str] = field(default=frozenset(), repr=False)
+
     @classmethod
-    def from_dict(cls, data: dict) -> Self:
+    def from_dict(cls, data: dict, index: int = 0) -> Self:
         """
         Allows us to create  QuizItem class instance from a
         quiz item dict item loaded from questions.json
         """
 
-        return cls(
+        item = cls(
             question=data["question"],
             correct=data["correct"],
             incorrect=data["incorrect"],
         )
+        item.build_buttons(index)
+        return item
+
+    def build_buttons(self, index: int) -> None:
+        """
+        Build the raw answer button payloads for this question.
+
+        Each button gets a random custom_id so that the correct answer
+        can't be worked out from the component data sent to the client
+
+        Parameters
+        ----------
+        index: :type:`int`
+            The position of this question in questions.json
+        """
+
+        self.buttons = []
+        for answer in [self.correct] + self.incorrect:
+            self.buttons.append(
+                {
+                    "type": disnake.ComponentType.button.value,
+                    "style": disnake.ButtonStyle.primary.value,
+                    "label": answer,
+                    "custom_id": f"quiz_answer:{index}:{os.urandom(4).hex()}",
+                }
+            )
+
+        self.correct_id = self.buttons[0]["custom_id"]
+        self.answer_ids = frozenset(b["custom_id"] for b in self.buttons)
+
+
+@functools.lru_cache(maxsize=1)
+def load_prebuilt_items() -> Tuple[QuizItem, ...]:
+    """Load the QuizItems and their answer buttons once, they are shared
+    by every quiz and must not be mutated"""
+
+    return tuple(
+        QuizItem.from_dict(item, index) for index, item in enumerate(load_questions())
+    )
 
 
 class Quiz:
@@ -87,6 +135,10 @@ class Quiz:
         self.correct = 0
         self.incorrect = 0
 
+        # the quiz runs in the task of the "Start Quiz" click, so every record
+        # carries that interaction's trace ID
+        self.log = logger.bind(guild_id=member.guild.id, member_id=member.id)
+
     async def start_quiz(self):
         """
         Starts the quiz and handles all of the necessary logic for iterating
@@ -94,66 +146,69 @@ class Quiz:
         the button click interactions.
         """
 
+        self.log.info("Quiz started")
         await asyncio.sleep(2)
 
         # iterate the QuizItems and present the questions/answers
         # to the user
         for i, item in enumerate(self.items):
 
-            # creates a list of all available answers and shuffles them
-            answers = [item.correct] + item.incorrect
-            random.shuffle(answers)
-
-            # construct the embed and view instances
+            # construct the embed and the shuffled answer buttons
             embed = self.build_embed(item)
-            view = self.create_view(answers)
+            components = self.create_view(item)
 
             # no interaction has happened yet, so we just edit the message
             if i == 0:
-                await self.message.edit(None, embed=embed, view=view)
+                await self.message.edit(None, embed=embed, components=components)
 
             # button interaction has taken place at this point, so
             # we need to edit the message and also respond to the inter
             else:
-                await inter.response.edit_message(None, embed=embed, view=view)
+                await inter.response.edit_message(
+                    None, embed=embed, components=components
+                )
 
-            # Waiting for the interaction from the user selecting an answer
+            # Waiting for the interaction from the user selecting an answer.
+            # There is no view, so clicks are routed to this quiz by custom_id.
             # if it times out, the user auto fails the quiz and will incur the cooldown
             try:
                 inter: disnake.MessageInteraction = await self.bot.wait_for(
-                    "button_click", check=lambda i: i.author == self.member, timeout=60
+                    "button_click",
+                    check=lambda i: i.author == self.member
+                    and i.component.custom_id in item.answer_ids,
+                    timeout=60,
                 )
             except asyncio.TimeoutError:
+                self.log.bind(question=i).info("Quiz timed out")
                 try:
                     await self.message.edit(
                         "Whoops. Looks like you ran out of time which caused you to fail this time. Try again in 10 minutes.",
                         embed=None,
-                        view=view.clear_items(),
+                        components=[],
                     )
                 except disnake.NotFound:
                     # In case the user closes the ephemeral message.  We will just
-                    # stop the view and end the quiz with no changes being made
+                    # end the quiz with no changes being made
                     pass
 
                 except:
                     raise  # raise any other exceptions so that can be caught and fixed
 
                 finally:
-                    # always stop the view and the quiz on any exception that takes place
-                    return view.stop()
+                    # always end the quiz on any exception that takes place
+                    return
 
-            # get the answer from the button and compare to verify
+            # compare the clicked button to verify
             # if the selected answer is correct or not
-            label = inter.component.label
-
-            if label == item.correct:
+            correct = inter.component.custom_id == item.correct_id
+            if correct:
                 self.correct += 1
             else:
                 self.incorrect += 1
 
-            # stops the view (buttons) to get it out of memory and not cause
-            # a memory leak with multiple views being constructed and sitting idle
-            view.stop()
+            self.log.bind(
+                question=i, correct=correct, answer_trace=f"{inter.id:x}"
+            ).debug("Quiz question answered")
 
         # quiz has finished (ie, all questions have been asked)
 
@@ -162,30 +217,34 @@ class Quiz:
             message = (
                 f"Great job! You got {self.correct} out of {len(self.items)} correct!"
             )
+            # recorded first so the role can be backfilled if adding it fails.
+            # Rewriting a large quizzed list is slow, so it runs in a thread
+            await asyncio.to_thread(
+                config.add_to_quizzed, self.member.guild.id, self.member.id
+            )
             await self.member.add_roles(disnake.Object(id=config.quiz_role))
 
         else:
             message = f"So close, but you only got {self.correct} out of {len(self.items)} correct."
             embed = config.get_incorrect_embed(self.member.guild.id)
 
-        await inter.response.edit_message(message, embed=embed, view=view.clear_items())
+        self.log.bind(correct=self.correct, total=len(self.items)).info(
+            "Quiz finished"
+        )
+        await inter.response.edit_message(message, embed=embed, components=[])
 
-    def create_view(self, answers: list[str]) -> disnake.ui.View:
+    def create_view(self, item: QuizItem) -> List[StaticActionRow]:
         """
-        Create the view and add answer buttons and then returns the view
+        Shuffle the item's prebuilt answer buttons and return them as
+        the message components
 
         Parameters
         ----------
-        answers: :type:`List[str]`
-             A list of the randomized correct/incorrect answer strings
+        item: :type:`QuizItem`
+             The QuizItem that represents the current question
         """
-        view = disnake.ui.View()
-        [
-            view.add_item(disnake.ui.Button(label=a, style=disnake.ButtonStyle.primary))
-            for a in answers
-        ]
 
-        return view
+        return [StaticActionRow(random.sample(item.buttons, len(item.buttons)))]
 
     def build_embed(self, item: QuizItem) -> disnake.Embed:
         """Builds the embed for the question and returns it
@@ -203,11 +262,7 @@ class Quiz:
         return embed
 
     def load_quiz_items(self) -> List[QuizItem]:
-        """Load the questions and answers from JSON and returns
-        a lit of QuizItem objects"""
-        items = []
-        data = load_questions()
-        for item in data:
-            items.append(QuizItem.from_dict(item))
-
-        return items
+        """Returns a new list of the QuizItem objects loaded from JSON,
+        the items themselves are shared between quizzes"""
+
+        return list(load_prebuilt_items())
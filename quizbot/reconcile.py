@@ -0,0 +1,267 @@
+import asyncio
+import functools
+import time
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+import disnake
+from loguru import logger
+
+from quizbot import config
+
+__all__ = (
+    "ReconcileReport",
+    "RoleReconciler",
+)
+
+
+@dataclass
+class ReconcileReport:
+    """Progress and results of a role reconciliation run"""
+
+    scanned: int = 0
+    granted: int = 0
+    revoked: int = 0
+    failed: int = 0
+    rate_limited: int = 0
+    resumed_after: Optional[int] = None
+    elapsed: float = 0.0
+    finished: bool = False
+
+    @property
+    def rate(self) -> float:
+        """Members scanned per second"""
+        return self.scanned / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class _Pacer:
+    """Spaces out requests so at most ``rate`` are started per second,
+    shared by all of the workers"""
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1 / rate
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+            self._next = max(now, self._next) + self.interval
+
+
+class RoleReconciler:
+    """
+    Grants the quiz role to members in the guild's quizzed list that are missing it,
+    and optionally revokes it from members that aren't in the list.
+
+    Members are streamed from the API in chunks ordered by ID.  Each chunk is
+    diffed against the quizzed set, the role changes are applied by a pool of
+    workers that share a request pacer, and the last member ID of the chunk is
+    checkpointed in the guild config so an interrupted run resumes after it.
+
+    Revoking trusts the quizzed list completely, any member missing from it
+    loses the role, including members given the role by hand.
+
+    The run is aborted with :class:`disnake.Forbidden` if the bot isn't allowed
+    to manage the role, since every other update would fail the same way.
+
+    Parameters
+    ----------
+    guild: :type:`disnake.Guild`
+        The guild to reconcile
+    role: :type:`disnake.abc.Snowflake`
+        The quiz role
+    revoke: :type:`bool`
+        Also remove the role from members that haven't passed the quiz
+    workers: :type:`int`
+        Number of concurrent role update workers
+    chunk_size: :type:`int`
+        Members handled between checkpoints
+    requests_per_second: :type:`float`
+        Maximum role updates started per second across all workers
+    """
+
+    def __init__(
+        self,
+        guild: disnake.Guild,
+        role: disnake.abc.Snowflake,
+        *,
+        revoke: bool = False,
+        workers: int = 4,
+        chunk_size: int = 1000,
+        requests_per_second: float = 8.0,
+    ) -> None:
+        self.guild = guild
+        self.role = role
+        self.revoke = revoke
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.report = ReconcileReport()
+
+        self._pacer = _Pacer(requests_per_second)
+        self._quizzed: Set[int] = set()
+        self._forbidden: Optional[disnake.Forbidden] = None
+        self._log = logger.bind(guild_id=guild.id)
+
+    def diff(
+        self, members: List[disnake.Member], quizzed: Set[int]
+    ) -> List[Tuple[disnake.Member, bool]]:
+        """Returns the (member, grant) role changes needed for the chunk"""
+
+        changes = []
+        for member in members:
+            has_role = member.get_role(self.role.id) is not None
+
+            if member.id in quizzed and not has_role:
+                changes.append((member, True))
+            elif self.revoke and has_role and member.id not in quizzed:
+                changes.append((member, False))
+
+        return changes
+
+    async def _apply(self, member: disnake.Member, grant: bool) -> None:
+        """Apply one role change, backing off and retrying if rate limited"""
+
+        reason = "Quiz role reconciliation"
+
+        for _ in range(5):
+            await self._pacer.wait()
+            try:
+                if grant:
+                    await member.add_roles(self.role, reason=reason)
+                    self.report.granted += 1
+                else:
+                    await member.remove_roles(self.role, reason=reason)
+                    self.report.revoked += 1
+                return
+
+            except disnake.NotFound:
+                return  # member left the guild since the chunk was fetched
+
+            except disnake.Forbidden:
+                raise  # aborts the run, see _worker
+
+            except disnake.HTTPException as e:
+                # disnake already waits out normal rate limits, this catches any
+                # that still surface so the whole run isn't lost to them
+                if e.status != 429:
+                    break
+
+                self.report.rate_limited += 1
+                retry_after = getattr(e, "retry_after", None) or 1.0
+                await asyncio.sleep(retry_after)
+
+        self.report.failed += 1
+        self._log.bind(member_id=member.id, grant=grant).warning(
+            "Could not update quiz role"
+        )
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            member, grant = await queue.get()
+            try:
+                # once forbidden, skip the rest of the queued changes
+                if self._forbidden is None:
+                    await self._apply(member, grant)
+            except disnake.Forbidden as e:
+                self.report.failed += 1
+                self._forbidden = e
+            except Exception:
+                self.report.failed += 1
+                self._log.bind(member_id=member.id).exception("Role update failed")
+            finally:
+                queue.task_done()
+
+    async def _flush(self, queue: asyncio.Queue, chunk: List[disnake.Member]) -> None:
+        """Apply the chunk's role changes and checkpoint once they are done"""
+
+        for change in self.diff(chunk, self._quizzed):
+            await queue.put(change)
+
+        await queue.join()
+
+        if self._forbidden is not None:
+            self._log.bind(member_id=chunk[0].id).error(
+                "Role reconciliation aborted, missing permission to manage the role"
+            )
+            raise self._forbidden
+
+        self.report.scanned += len(chunk)
+        # the checkpoint rewrites the whole guild config (including every
+        # quizzed member), so keep it off the event loop
+        await asyncio.to_thread(
+            functools.partial(
+                config.update_reconcile_checkpoint,
+                self.guild.id,
+                chunk[-1].id,
+                revoke=self.revoke,
+            )
+        )
+
+    async def run(
+        self,
+        progress: Optional[Callable[[ReconcileReport], Awaitable[None]]] = None,
+    ) -> ReconcileReport:
+        """
+        Run the reconciliation, resuming from the stored checkpoint if there is one
+
+        Parameters
+        ----------
+        progress: :type:`Optional[Callable[[ReconcileReport], Awaitable[None]]]`
+            Called with the report after every chunk
+        """
+
+        self._quizzed = await asyncio.to_thread(config.get_quizzed, self.guild.id)
+        after = await asyncio.to_thread(
+            functools.partial(
+                config.get_reconcile_checkpoint, self.guild.id, revoke=self.revoke
+            )
+        )
+        self.report.resumed_after = after
+
+        self._log.bind(resume_after=after, quizzed=len(self._quizzed)).info(
+            "Role reconciliation started"
+        )
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+        workers = [
+            asyncio.create_task(self._worker(queue)) for _ in range(self.workers)
+        ]
+        start = time.perf_counter()
+
+        try:
+            chunk: List[disnake.Member] = []
+            async for member in self.guild.fetch_members(
+                limit=None, after=disnake.Object(after) if after else None
+            ):
+                chunk.append(member)
+                if len(chunk) < self.chunk_size:
+                    continue
+
+                await self._flush(queue, chunk)
+                chunk = []
+
+                self.report.elapsed = time.perf_counter() - start
+                if progress is not None:
+                    await progress(self.report)
+
+            if chunk:
+                await self._flush(queue, chunk)
+
+        finally:
+            for worker in workers:
+                worker.cancel()
+            self.report.elapsed = time.perf_counter() - start
+
+        self.report.finished = True
+        await asyncio.to_thread(config.update_reconcile_checkpoint, self.guild.id, None)
+
+        self._log.bind(**self.report.to_dict()).info(
+            f"Role reconciliation finished, {self.report.rate:.0f} members/s"
+        )
+        return self.report
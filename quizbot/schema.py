@@ -0,0 +1,239 @@
+import json
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Set
+
+from quizbot.errors import InvalidConfig
+
+try:
+    import msgspec
+except ModuleNotFoundError:
+    msgspec = None
+    _DecodeErrors = (ValueError,)
+else:
+    _DecodeErrors = (ValueError, msgspec.DecodeError)
+
+__all__ = (
+    "SCHEMA_VERSION",
+    "GuildConfig",
+    "ConfigFile",
+    "migrate",
+    "decode",
+    "encode",
+)
+
+
+# bump this and add a function to MIGRATIONS whenever the stored layout changes
+SCHEMA_VERSION = 3
+
+
+def _optional_id(data: dict, key: str) -> Optional[int]:
+    value = data.get(key)
+    if value is None or (isinstance(value, int) and not isinstance(value, bool)):
+        return value
+
+    raise InvalidConfig(f"{key} must be an integer ID or null, got {value!r}")
+
+
+def _embed(data: dict, key: str) -> Dict[str, Any]:
+    value = data.get(key)
+    if isinstance(value, dict):
+        return value
+
+    raise InvalidConfig(f"{key} must be an embed object, got {value!r}")
+
+
+@dataclass(slots=True)
+class GuildConfig:
+    """
+    The stored configuration for a single guild
+
+    Attributes
+    ----------
+    guild_id: :type:`int`
+        The ID of the guild this config belongs to
+
+    quiz_message_id: :type:`Optional[int]`
+        The ID of the message with the "Start Quiz" button
+
+    quiz_channel_id: :type:`Optional[int]`
+        The ID of the channel the "Start Quiz" message was sent in
+
+    correct: :type:`dict`
+        The embed shown when a member passes the quiz, as a dict
+
+    incorrect: :type:`dict`
+        The embed shown when a member fails the quiz, as a dict
+
+    quiz: :type:`dict`
+        The embed on the "Start Quiz" message, as a dict
+
+    quizzed: :type:`Set[int]`
+        IDs of the members that have passed the quiz
+
+    reconcile_after: :type:`Optional[int]`
+        The last member ID handled by an interrupted role reconciliation,
+        which resumes after it
+
+    reconcile_revoke: :type:`bool`
+        Whether the interrupted role reconciliation was also revoking roles
+    """
+
+    guild_id: int
+    correct: Dict[str, Any]
+    incorrect: Dict[str, Any]
+    quiz: Dict[str, Any]
+    quiz_message_id: Optional[int] = None
+    quiz_channel_id: Optional[int] = None
+    quizzed: Set[int] = field(default_factory=set)
+    reconcile_after: Optional[int] = None
+    reconcile_revoke: bool = False
+
+    @classmethod
+    def from_dict(cls, guild_id: int, data: dict) -> "GuildConfig":
+        """Create and validate a GuildConfig from its stored dict"""
+
+        if not isinstance(data, dict):
+            raise InvalidConfig(f"Guild {guild_id} config must be an object")
+
+        quizzed = data.get("quizzed", [])
+        if not isinstance(quizzed, list) or not all(
+            isinstance(member, int) for member in quizzed
+        ):
+            raise InvalidConfig(f"Guild {guild_id} quizzed must be a list of IDs")
+
+        return cls(
+            guild_id=guild_id,
+            correct=_embed(data, "correct"),
+            incorrect=_embed(data, "incorrect"),
+            quiz=_embed(data, "quiz"),
+            quiz_message_id=_optional_id(data, "quiz_message_id"),
+            quiz_channel_id=_optional_id(data, "quiz_channel_id"),
+            quizzed=set(quizzed),
+            reconcile_after=_optional_id(data, "reconcile_after"),
+            reconcile_revoke=data.get("reconcile_revoke") is True,
+        )
+
+    def to_dict(self) -> dict:
+        """The dict stored in the config file, the guild ID is stored as its key"""
+
+        return {
+            "quiz_message_id": self.quiz_message_id,
+            "quiz_channel_id": self.quiz_channel_id,
+            "correct": self.correct,
+            "incorrect": self.incorrect,
+            "quiz": self.quiz,
+            "quizzed": sorted(self.quizzed),
+            "reconcile_after": self.reconcile_after,
+            "reconcile_revoke": self.reconcile_revoke,
+        }
+
+
+@dataclass(slots=True)
+class ConfigFile:
+    """All stored guild configs, keyed by guild ID"""
+
+    guilds: Dict[int, GuildConfig] = field(default_factory=dict)
+    version: int = SCHEMA_VERSION
+
+
+def _migrate_v0(data: dict) -> dict:
+    """v0 had no header, just the guild configs keyed by the guild ID"""
+
+    return {"version": 1, "guilds": data}
+
+
+def _migrate_v1(data: dict) -> dict:
+    """v2 added the role reconciliation checkpoint"""
+
+    for guild in data["guilds"].values():
+        guild.setdefault("reconcile_after", None)
+
+    return {"version": 2, "guilds": data["guilds"]}
+
+
+def _migrate_v2(data: dict) -> dict:
+    """v3 records whether the reconciliation checkpoint was revoking roles"""
+
+    for guild in data["guilds"].values():
+        guild.setdefault("reconcile_revoke", False)
+
+    return {"version": 3, "guilds": data["guilds"]}
+
+
+# migration functions keyed by the version they upgrade from
+MIGRATIONS: Dict[int, Callable[[dict], dict]] = {
+    0: _migrate_v0,
+    1: _migrate_v1,
+    2: _migrate_v2,
+}
+
+
+def migrate(data: dict) -> dict:
+    """Upgrade a raw decoded config to the current schema version"""
+
+    if not isinstance(data, dict):
+        raise InvalidConfig("Config must be an object")
+
+    version = data.get("version", 0) if "guilds" in data else 0
+    if version > SCHEMA_VERSION:
+        raise InvalidConfig(
+            f"Config version {version} is newer than supported ({SCHEMA_VERSION})"
+        )
+
+    while version < SCHEMA_VERSION:
+        data = MIGRATIONS[version](data)
+        version = data["version"]
+
+    return data
+
+
+def _loads(data: bytes) -> Any:
+    if msgspec is not None:
+        return msgspec.json.decode(data)
+
+    return json.loads(data)
+
+
+def _dumps(data: Any) -> bytes:
+    if msgspec is not None:
+        return msgspec.json.encode(data)
+
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def decode(data: bytes) -> ConfigFile:
+    """Decode, migrate and validate a stored config file"""
+
+    try:
+        raw = migrate(_loads(data))
+    except _DecodeErrors as e:
+        raise InvalidConfig(f"Config is not valid JSON: {e}") from e
+
+    guilds = raw.get("guilds")
+    if not isinstance(guilds, dict):
+        raise InvalidConfig("Config guilds must be an object")
+
+    config = ConfigFile(version=raw["version"])
+    for key, value in guilds.items():
+        try:
+            guild_id = int(key)
+        except ValueError:
+            raise InvalidConfig(f"Guild key {key!r} is not an ID") from None
+
+        config.guilds[guild_id] = GuildConfig.from_dict(guild_id, value)
+
+    return config
+
+
+def encode(config: ConfigFile) -> bytes:
+    """Encode the config in its compact on-disk form"""
+
+    return _dumps(
+        {
+            "version": config.version,
+            "guilds": {
+                str(guild_id): guild.to_dict()
+                for guild_id, guild in config.guilds.items()
+            },
+        }
+    )
@@ -0,0 +1,389 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from urllib.parse import urlparse
+
+from quizbot.errors import StateBackendError
+
+__all__ = (
+    "StateBackend",
+    "MemoryBackend",
+    "RedisBackend",
+    "create_backend",
+)
+
+
+Reply = Union[None, int, bytes, str, List["Reply"]]
+
+
+class _ExpiringKeys:
+    """
+    Small local map of key -> monotonic expiry time.
+
+    Used as the whole store for the in-process backend and as the
+    near-cache in front of the networked backend
+    """
+
+    def __init__(self, max_size: int = 50_000) -> None:
+        self.max_size = max_size
+        self._keys: Dict[str, float] = {}
+
+    def remaining(self, key: str) -> Optional[float]:
+        """Seconds left on the key, or None if it is missing/expired"""
+
+        expires = self._keys.get(key)
+        if expires is None:
+            return None
+
+        remaining = expires - time.monotonic()
+        if remaining <= 0:
+            del self._keys[key]
+            return None
+
+        return remaining
+
+    def set(self, key: str, seconds: float) -> None:
+        if len(self._keys) >= self.max_size:
+            self.purge()
+
+        self._keys[key] = time.monotonic() + seconds
+
+    def discard(self, key: str) -> None:
+        self._keys.pop(key, None)
+
+    def purge(self) -> None:
+        """Drop expired keys, and the soonest to expire half if still full"""
+
+        now = time.monotonic()
+        self._keys = {k: v for k, v in self._keys.items() if v > now}
+
+        if len(self._keys) >= self.max_size:
+            keep = sorted(self._keys.items(), key=lambda kv: kv[1])
+            self._keys = dict(keep[len(keep) // 2 :])
+
+
+class StateBackend(ABC):
+    """
+    State shared by every bot process, such as per-user cooldowns and
+    which members currently have a quiz running.
+
+    Keys are plain strings, namespacing is handled by the backend.
+    """
+
+    @abstractmethod
+    async def try_cooldown(self, key: str, seconds: float) -> Optional[float]:
+        """
+        Atomically start a cooldown for the key if one isn't already active.
+
+        Returns None if the cooldown was started, otherwise the number of
+        seconds until the existing cooldown expires
+        """
+
+    @abstractmethod
+    async def clear_cooldown(self, key: str) -> None:
+        """End the key's cooldown early, if it has one"""
+
+    @abstractmethod
+    async def acquire_session(self, key: str, ttl: float) -> bool:
+        """
+        Mark the key as having an active session. Returns False if a session
+        already exists. The session automatically expires after ``ttl`` seconds
+        """
+
+    @abstractmethod
+    async def release_session(self, key: str) -> None:
+        """End a session started with :meth:`acquire_session`"""
+
+    async def close(self) -> None:
+        """Release any resources held by the backend"""
+
+
+class MemoryBackend(StateBackend):
+    """State backend that lives in this process only"""
+
+    def __init__(self) -> None:
+        self._cooldowns = _ExpiringKeys()
+        self._sessions = _ExpiringKeys()
+
+    async def try_cooldown(self, key: str, seconds: float) -> Optional[float]:
+        if (remaining := self._cooldowns.remaining(key)) is not None:
+            return remaining
+
+        self._cooldowns.set(key, seconds)
+        return None
+
+    async def clear_cooldown(self, key: str) -> None:
+        self._cooldowns.discard(key)
+
+    async def acquire_session(self, key: str, ttl: float) -> bool:
+        if self._sessions.remaining(key) is not None:
+            return False
+
+        self._sessions.set(key, ttl)
+        return True
+
+    async def release_session(self, key: str) -> None:
+        self._sessions.discard(key)
+
+
+class RedisBackend(StateBackend):
+    """
+    State backend that talks to any Redis protocol (RESP) compatible server
+    so that several bot processes share cooldowns and sessions.
+
+    Commands are sent over a single connection.  Multi command operations
+    are pipelined into one round trip, and cooldowns and sessions started by
+    this process are kept in a local near-cache so repeat checks (spam clicks)
+    never hit the network.
+
+    Attributes
+    ----------
+    round_trips: :type:`int`
+        Number of network round trips made, useful for benchmarks
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        *,
+        db: int = 0,
+        password: Optional[str] = None,
+        prefix: str = "quizbot:",
+        near_cache: bool = True,
+        timeout: float = 5.0,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.prefix = prefix
+        self.timeout = timeout
+        self.round_trips = 0
+
+        self._near: Optional[_ExpiringKeys] = _ExpiringKeys() if near_cache else None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisBackend":
+        """Create the backend from a ``redis://[:password@]host[:port][/db]`` url"""
+
+        parsed = urlparse(url)
+        db = parsed.path.lstrip("/")
+
+        return cls(
+            parsed.hostname or "localhost",
+            parsed.port or 6379,
+            db=int(db) if db else 0,
+            password=parsed.password,
+            **kwargs,
+        )
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(
+            self.host, self.port
+        )
+
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+
+        if setup:
+            for reply in await self._send(setup):
+                # a wrong password or db index would otherwise only show up as
+                # NOAUTH errors on every later command
+                if isinstance(reply, StateBackendError):
+                    raise reply
+
+    async def _send(self, commands: Sequence[Tuple]) -> List[Reply]:
+        """Write all commands, then read all replies in a single round trip"""
+
+        self._writer.write(b"".join(_encode(command) for command in commands))
+        await self._writer.drain()
+        self.round_trips += 1
+
+        return [
+            await asyncio.wait_for(_read_reply(self._reader), self.timeout)
+            for _ in commands
+        ]
+
+    async def pipeline(self, *commands: Tuple) -> List[Reply]:
+        """
+        Send several commands in one round trip and return their replies in order.
+
+        Error replies are returned as :class:`StateBackendError` instances
+        rather than raised so the other replies are not lost.  Connection
+        failures are raised as :class:`StateBackendError`
+        """
+
+        async with self._lock:
+            try:
+                if self._writer is None or self._writer.is_closing():
+                    await self._connect()
+
+                return await self._send(commands)
+            except StateBackendError:
+                await self._disconnect()
+                raise
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                # drop the connection so the next call reconnects cleanly
+                await self._disconnect()
+                raise StateBackendError(
+                    f"Could not reach state backend at {self.host}:{self.port}: {e!r}"
+                ) from e
+
+    async def execute(self, *command) -> Reply:
+        """Send a single command and return its reply, raising error replies"""
+
+        (reply,) = await self.pipeline(command)
+        if isinstance(reply, StateBackendError):
+            raise reply
+
+        return reply
+
+    async def try_cooldown(self, key: str, seconds: float) -> Optional[float]:
+        key = f"{self.prefix}cooldown:{key}"
+
+        if self._near is not None and (remaining := self._near.remaining(key)):
+            return remaining
+
+        # SET NX is the atomic check-and-set, PTTL tells us how long is left
+        # if another process already holds the cooldown
+        for _ in range(3):
+            replies = await self.pipeline(
+                ("SET", key, 1, "NX", "PX", int(seconds * 1000)), ("PTTL", key)
+            )
+            for reply in replies:
+                if isinstance(reply, StateBackendError):
+                    raise reply
+
+            acquired, pttl = replies
+
+            if acquired is not None:
+                # only cooldowns set by this process are near-cached.  A refund
+                # is issued by the process that set the cooldown, so it always
+                # clears the near-cache entry, while cooldowns seen from other
+                # processes are checked on the server every time
+                if self._near is not None:
+                    self._near.set(key, seconds)
+                return None
+
+            if pttl > 0:
+                return pttl / 1000
+
+            if pttl == -1:
+                # the key has no expiry, treat it as a full cooldown
+                return seconds
+
+            # -2: the key expired between SET and PTTL, try to set it again
+
+        return seconds
+
+    async def clear_cooldown(self, key: str) -> None:
+        key = f"{self.prefix}cooldown:{key}"
+
+        if self._near is not None:
+            self._near.discard(key)
+
+        await self.execute("DEL", key)
+
+    async def acquire_session(self, key: str, ttl: float) -> bool:
+        key = f"{self.prefix}session:{key}"
+
+        if self._near is not None and self._near.remaining(key):
+            return False
+
+        acquired = await self.execute("SET", key, 1, "NX", "PX", int(ttl * 1000))
+
+        # only sessions held by this process are near-cached, since
+        # another process could end theirs without us knowing
+        if acquired is not None and self._near is not None:
+            self._near.set(key, ttl)
+
+        return acquired is not None
+
+    async def release_session(self, key: str) -> None:
+        key = f"{self.prefix}session:{key}"
+
+        if self._near is not None:
+            self._near.discard(key)
+
+        await self.execute("DEL", key)
+
+    async def _disconnect(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except OSError:
+                pass
+
+        self._reader = self._writer = None
+
+    async def close(self) -> None:
+        async with self._lock:
+            await self._disconnect()
+
+
+def _encode(command: Tuple) -> bytes:
+    """Encode a command as a RESP array of bulk strings"""
+
+    parts = [b"*%d\r\n" % len(command)]
+    for arg in command:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+
+    return b"".join(parts)
+
+
+async def _read_reply(reader: asyncio.StreamReader) -> Reply:
+    """Read a single RESP reply from the stream"""
+
+    line = await reader.readuntil(b"\r\n")
+    prefix, body = line[:1], line[1:-2]
+
+    if prefix == b"+":
+        return body.decode()
+
+    if prefix == b"-":
+        return StateBackendError(body.decode())
+
+    if prefix == b":":
+        return int(body)
+
+    if prefix == b"$":
+        length = int(body)
+        if length == -1:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+
+    if prefix == b"*":
+        length = int(body)
+        if length == -1:
+            return None
+        return [await _read_reply(reader) for _ in range(length)]
+
+    raise StateBackendError(f"Unknown reply type: {line!r}")
+
+
+def create_backend(url: Optional[str]) -> StateBackend:
+    """
+    Create the state backend for the given url.  ``redis://`` urls use the
+    networked backend, anything else keeps the state in this process
+
+    Parameters
+    ----------
+    url: :type:`Optional[str]`
+        The backend url, usually loaded from the STATE_URL environment variable
+    """
+
+    if url and url.startswith("redis://"):
+        return RedisBackend.from_url(url)
+
+    return MemoryBackend()
@@ -0,0 +1,242 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Tuple
+
+from loguru import logger
+
+from quizbot import schema
+from quizbot.schema import ConfigFile, GuildConfig
+
+try:
+    import fcntl
+except ModuleNotFoundError:
+    # not available on Windows, see GuildStore
+    fcntl = None
+
+__all__ = ("GuildStore",)
+
+
+# identifies one version of a guild's file, None if it has no file
+_Stamp = Optional[Tuple[int, int]]
+
+
+class GuildStore:
+    """
+    Stores each guild's config in its own file and keeps a bounded number
+    of them in memory.
+
+    Files are spread over 256 sub-directories by the low byte of the guild ID
+    (``<root>/<xx>/<guild_id>.json``) so no directory gets too large.  Each file
+    is a single guild :class:`ConfigFile` so it goes through the same schema
+    migrations as before.
+
+    Guild configs are loaded on first access and kept in an LRU of
+    ``max_size`` guilds.  Guilds without a file get a default config that
+    is only kept in memory until it is first changed.
+
+    Several bot processes can share the same files.  Every change goes
+    through :meth:`update`, which re-reads the file, applies the change and
+    writes it back while holding a lock on the guild's file, so one process
+    never overwrites what another has written (such as quizzed members).
+    :meth:`get` checks the file's inode and modification time and re-reads
+    it once another process has replaced it.  The lock needs ``fcntl``, so on Windows only a
+    single process may write to the files.
+
+    Large guilds take tens of milliseconds to read or write, so the store may
+    also be used from worker threads (``asyncio.to_thread``) to keep that off
+    the event loop
+
+    Parameters
+    ----------
+    root: :type:`str`
+        Directory the guild files are stored in
+    default: :type:`Callable[[int], GuildConfig]`
+        Creates the config for a guild that doesn't have one yet
+    max_size: :type:`int`
+        Maximum number of guild configs kept in memory
+    """
+
+    def __init__(
+        self,
+        root: str,
+        default: Callable[[int], GuildConfig],
+        *,
+        max_size: int = 1000,
+    ) -> None:
+        self.root = root
+        self.default = default
+        self.max_size = max_size
+
+        self._cache: "OrderedDict[int, Tuple[GuildConfig, _Stamp]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # one per shard directory, so threads of this process never write the
+        # same guild at once even where there is no fcntl lock
+        self._write_locks = [threading.Lock() for _ in range(256)]
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def path(self, guild_id: int) -> str:
+        """The file the guild's config is stored in"""
+
+        return os.path.join(self.root, f"{guild_id & 0xFF:02x}", f"{guild_id}.json")
+
+    def read(self, guild_id: int) -> Optional[GuildConfig]:
+        """Read the guild's config from its file, None if it doesn't have one"""
+
+        return self._read(guild_id)[0]
+
+    def _read(self, guild_id: int) -> Tuple[Optional[GuildConfig], _Stamp]:
+        try:
+            with open(self.path(guild_id), "rb") as f:
+                # stamp the file that was actually read, it may be replaced
+                # right after
+                stat = os.fstat(f.fileno())
+                data = schema.decode(f.read())
+        except FileNotFoundError:
+            return None, None
+
+        return data.guilds.get(guild_id), (stat.st_ino, stat.st_mtime_ns)
+
+    def _stamp(self, guild_id: int) -> _Stamp:
+        try:
+            stat = os.stat(self.path(guild_id))
+        except FileNotFoundError:
+            return None
+
+        # every write replaces the file, so the inode changes even where the
+        # modification time is too coarse to tell two writes apart
+        return stat.st_ino, stat.st_mtime_ns
+
+    def write(self, guild: GuildConfig) -> None:
+        """Write the guild's config to its file"""
+
+        path = self.path(guild.guild_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # write to a temp file first so a crash mid-write can't corrupt the config
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(schema.encode(ConfigFile(guilds={guild.guild_id: guild})))
+        os.replace(tmp, path)
+
+    @contextmanager
+    def _locked(self, guild_id: int) -> Iterator[None]:
+        """Hold an exclusive lock on the guild's file, shared between processes"""
+
+        with self._write_locks[guild_id & 0xFF]:
+            if fcntl is None:
+                yield
+                return
+
+            path = self.path(guild_id)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            with open(f"{path}.lock", "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def get(self, guild_id: int) -> GuildConfig:
+        """Returns the guild's config, loading it or creating a default one as needed"""
+
+        stamp = self._stamp(guild_id)
+        with self._cache_lock:
+            cached = self._cache.get(guild_id)
+            if cached is not None and cached[1] == stamp:
+                self._cache.move_to_end(guild_id)
+                return cached[0]
+
+        # not cached, or the file changed since it was
+        return self.refresh(guild_id)
+
+    def refresh(self, guild_id: int) -> GuildConfig:
+        """Re-read the guild's config from its file, picking up changes
+        made by other processes"""
+
+        guild, stamp = self._read(guild_id)
+        if guild is None:
+            guild = self.default(guild_id)
+
+        self._insert(guild, stamp)
+        return guild
+
+    def update(
+        self, guild_id: int, change: Callable[[GuildConfig], None]
+    ) -> GuildConfig:
+        """
+        Apply ``change`` to the latest stored copy of the guild's config and
+        write it straight away.  Returns the updated config, which also
+        replaces the cached one
+        """
+
+        with self._locked(guild_id):
+            guild = self.read(guild_id)
+            if guild is None:
+                guild = self.default(guild_id)
+
+            change(guild)
+            self.write(guild)
+            stamp = self._stamp(guild_id)
+
+        self._insert(guild, stamp)
+        return guild
+
+    def _insert(self, guild: GuildConfig, stamp: _Stamp) -> None:
+        with self._cache_lock:
+            self._cache[guild.guild_id] = (guild, stamp)
+            self._cache.move_to_end(guild.guild_id)
+
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def stored_ids(self) -> Iterator[int]:
+        """IDs of every guild with a stored config file"""
+
+        if not os.path.isdir(self.root):
+            return
+
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+
+            for entry in os.scandir(shard.path):
+                name, ext = os.path.splitext(entry.name)
+                if ext == ".json" and name.isdigit():
+                    yield int(name)
+
+    def migrate_single_file(self, path: str) -> int:
+        """
+        Split an old single file config into per-guild files. The old file is
+        renamed to ``<path>.migrated`` afterwards.  Returns the number of guilds
+        migrated, 0 if there was no file to migrate.
+
+        Safe to run from several processes at once, whichever gets to the
+        file first migrates it and the others find it already gone
+        """
+
+        try:
+            with open(path, "rb") as f:
+                data = schema.decode(f.read())
+        except FileNotFoundError:
+            return 0
+
+        for guild in data.guilds.values():
+            # guilds that already have their own file are newer than the old file
+            with self._locked(guild.guild_id):
+                if not os.path.exists(self.path(guild.guild_id)):
+                    self.write(guild)
+
+        try:
+            os.replace(path, f"{path}.migrated")
+        except FileNotFoundError:
+            return 0  # another process finished the migration first
+
+        logger.bind(guilds=len(data.guilds), path=path).info(
+            "Migrated single file config to per-guild files"
+        )
+        return len(data.guilds)
@@ -0,0 +1,161 @@
+import asyncio
+import time
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING
+
+import disnake
+from loguru import logger
+
+from quizbot import components, config
+
+if TYPE_CHECKING:
+    from quizbot.bot import QuizBot
+
+__all__ = (
+    "WarmupReport",
+    "warmup",
+)
+
+
+@dataclass
+class WarmupReport:
+    """Progress and results of the startup warmup"""
+
+    guilds: int = 0
+    unconfigured: int = 0
+    unavailable: int = 0
+    done: int = 0
+    failed: int = 0
+    missing_roles: int = 0
+    messages_ok: int = 0
+    messages_repaired: int = 0
+    messages_missing: int = 0
+    duration: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _has_start_button(message: disnake.Message) -> bool:
+    return any(
+        getattr(component, "custom_id", None) == "begin_quiz"
+        for row in message.components
+        for component in getattr(row, "children", ())
+    )
+
+
+async def warm_guild(guild: disnake.Guild, report: WarmupReport) -> None:
+    """
+    Preload the guild's stored config and check that its roles and
+    "Start Quiz" message still exist
+
+    Parameters
+    ----------
+    guild: :type:`disnake.Guild`
+        The guild to warm up
+    report: :type:`WarmupReport`
+        The report to record the results in
+    """
+
+    log = logger.bind(guild_id=guild.id)
+
+    # loads the config (and its embeds) so the first click doesn't pay for it.
+    # only called for guilds with a stored config, so no default is created
+    guild_config = config.get_guild(guild.id)
+
+    missing = [
+        role
+        for role in (*config.required_roles, config.quiz_role)
+        if guild.get_role(role) is None
+    ]
+    if missing:
+        report.missing_roles += 1
+        log.bind(roles=missing).warning("Configured quiz roles not found in guild")
+
+    message_id = guild_config.quiz_message_id
+    channel_id = guild_config.quiz_channel_id
+    if message_id is None or channel_id is None:
+        return
+
+    # only a NotFound from Discord means the message is gone.  A channel
+    # missing from the cache is fetched, and any other error is raised so
+    # the guild counts as failed instead of losing its stored message
+    try:
+        channel = guild.get_channel(channel_id)
+        if channel is None:
+            channel = await guild.fetch_channel(channel_id)
+        message = await channel.fetch_message(message_id)
+    except disnake.NotFound:
+        # forget the message so the next save of the quiz embed sends a new one
+        report.messages_missing += 1
+        config.update_quiz_message(guild.id, None, None)
+        log.bind(message_id=message_id, channel_id=channel_id).warning(
+            "Stored quiz message no longer exists"
+        )
+        return
+
+    if _has_start_button(message):
+        report.messages_ok += 1
+        return
+
+    # the message lost its button (edited elsewhere), so put it back
+    await message.edit(components=components.start_quiz_components())
+    report.messages_repaired += 1
+    log.bind(message_id=message_id).info("Restored Start Quiz button")
+
+
+async def warmup(bot: "QuizBot", *, concurrency: int = 8) -> WarmupReport:
+    """
+    Warm up every guild the bot is in that has a stored config, ``concurrency``
+    guilds at a time.  Guilds that never set up the quiz are skipped, so the
+    config cache only holds guilds that use the bot, and guilds that are
+    currently unavailable are left alone.  Progress is logged as it goes and the final
+    report is returned.
+
+    Parameters
+    ----------
+    bot: :type:`QuizBot`
+        The connected bot
+    concurrency: :type:`int`
+        Maximum number of guilds warmed up at once
+    """
+
+    # listing the config directory is blocking, keep it off the event loop
+    store = config.store()
+    stored = await asyncio.to_thread(lambda: set(store.stored_ids()))
+    configured = [guild for guild in bot.guilds if guild.id in stored]
+
+    # unavailable guilds (outages) have no roles or channels cached, checking
+    # them would report everything as missing
+    guilds = [guild for guild in configured if not guild.unavailable]
+
+    report = bot.warmup_report = WarmupReport(
+        guilds=len(guilds),
+        unconfigured=len(bot.guilds) - len(configured),
+        unavailable=len(configured) - len(guilds),
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+    progress_every = max(1, report.guilds // 10)
+    start = time.perf_counter()
+
+    async def run(guild: disnake.Guild) -> None:
+        async with semaphore:
+            try:
+                await warm_guild(guild, report)
+            except Exception:
+                report.failed += 1
+                logger.bind(guild_id=guild.id).exception("Warmup failed for guild")
+
+        report.done += 1
+        if report.done % progress_every == 0 or report.done == report.guilds:
+            logger.bind(done=report.done, guilds=report.guilds).info(
+                f"Warmup progress {report.done}/{report.guilds} guilds"
+            )
+
+    await asyncio.gather(*(run(guild) for guild in guilds))
+
+    report.duration = time.perf_counter() - start
+    logger.bind(**report.to_dict()).info(
+        f"Warmup finished in {report.duration:.2f}s"
+    )
+    return report